@@ -0,0 +1,79 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compare two results of benchmarks.run, the exit code is 1 when a stage
+is slower than the threshold allows.
+
+python -m benchmarks.compare --threshold 1.2 before.json after.json
+"""
+
+from typing import Dict, List
+import getopt
+import json
+import sys
+
+short_options = "t:"
+long_options = ["threshold="]
+
+
+def compare(old: Dict, new: Dict, threshold: float = 1.2) -> List[Dict]:
+    """
+    Return the stages of the cases found in both results with the old and
+    new median, their ratio and whether the ratio exceeds the threshold
+    """
+    old_results = {(result['case'], result['stage']): result for result in old['results']}
+    rows = []
+    for result in new['results']:
+        key = (result['case'], result['stage'])
+        if key not in old_results:
+            continue
+        before = old_results[key]['median']
+        ratio = result['median'] / before if before > 0 else 1.0
+        rows.append({'case': key[0], 'stage': key[1], 'old': before, 'new': result['median'],
+                     'ratio': ratio, 'regression': ratio > threshold})
+    return rows
+
+
+def main():
+    try:
+        arguments, values = getopt.gnu_getopt(sys.argv[1:], short_options, long_options)
+    except getopt.error as err:
+        print(str(err))
+        sys.exit(2)
+
+    threshold = 1.2
+    for arg, value in arguments:
+        if arg in ("-t", "--threshold"):
+            threshold = float(value)
+    if len(values) != 2:
+        print('Usage: python -m benchmarks.compare [--threshold 1.2] old.json new.json')
+        sys.exit(2)
+
+    with open(values[0]) as f:
+        old = json.load(f)
+    with open(values[1]) as f:
+        new = json.load(f)
+    rows = compare(old, new, threshold)
+    for row in rows:
+        flag = '  slower' if row['regression'] else ''
+        print(f"{row['case']:>16} {row['stage']:>12}: {row['old'] * 1000:9.2f} ms -> "
+              f"{row['new'] * 1000:9.2f} ms  x{row['ratio']:.2f}{flag}")
+    if any(row['regression'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
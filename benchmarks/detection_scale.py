@@ -0,0 +1,103 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Speed and recall of the text detection on downscaled images.
+The boxes found at full resolution are the reference, the recall is the
+fraction of reference boxes matched (IoU >= 0.5) at each max side.
+
+python -m benchmarks.detection_scale --max-side 1280,1920,2560 image1.png image2.png
+"""
+
+from typing import Dict, List, Optional
+from timeit import default_timer
+import getopt
+import json
+import sys
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from image_translator.utils import detection
+from image_translator.utils import model_registry
+
+short_options = "m:o:"
+long_options = ["max-side=", "output="]
+
+
+def iou(box1: List[int], box2: List[int]) -> float:
+    """IoU of two boxes [x_min, x_max, y_min, y_max]"""
+    width = min(box1[1], box2[1]) - max(box1[0], box2[0])
+    height = min(box1[3], box2[3]) - max(box1[2], box2[2])
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    area1 = (box1[1] - box1[0]) * (box1[3] - box1[2])
+    area2 = (box2[1] - box2[0]) * (box2[3] - box2[2])
+    return inter / (area1 + area2 - inter)
+
+
+def recall(reference: List, boxes: List, threshold: float = 0.5) -> float:
+    if not reference:
+        return 1.0
+    found = sum(1 for ref in reference if any(iou(ref, box) >= threshold for box in boxes))
+    return found / len(reference)
+
+
+def run(images: List[np.ndarray], max_sides: List[Optional[int]]) -> List[Dict]:
+    reader = model_registry.get_reader(['en'])
+    results = []
+    for index, img in enumerate(images):
+        reference = None
+        for max_side in [None] + max_sides:
+            then = default_timer()
+            boxes = detection.detect_boxes(reader, img, max_side)[0]
+            seconds = default_timer() - then
+            if reference is None:
+                reference = boxes
+            results.append({'image': index, 'shape': list(img.shape[:2]), 'max_side': max_side,
+                             'seconds': seconds, 'boxes': len(boxes),
+                             'recall': recall(reference, boxes)})
+    return results
+
+
+def main():
+    try:
+        arguments, values = getopt.gnu_getopt(sys.argv[1:], short_options, long_options)
+    except getopt.error as err:
+        print(str(err))
+        sys.exit(2)
+
+    max_sides: List[Optional[int]] = [1280, 1920, 2560]
+    output = None
+    for arg, value in arguments:
+        if arg in ("-m", "--max-side"):
+            max_sides = [int(side) for side in value.split(',')]
+        elif arg in ("-o", "--output"):
+            output = value
+
+    images = [cv2.imread(path, cv2.IMREAD_COLOR) for path in values] or [synthetic.text_image(4000, 3000)[0]]
+    results = run(images, max_sides)
+    for result in results:
+        print(f"image {result['image']} max side {result['max_side']}: "
+              f"{result['seconds']:.2f} s, {result['boxes']} boxes, recall {result['recall']:.3f}")
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Time each stage of the pipeline on generated text images of several
+sizes and densities. The detection, the ocr and the translator are local
+stand-ins by default (see benchmarks.synthetic), so the results only
+depend on the code and can be compared between commits with benchmarks.compare.
+
+python -m benchmarks.run --sizes 1000x800,4000x1500 --densities 0.3,1 --repeat 5 --output results.json
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from timeit import default_timer
+import datetime
+import getopt
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+import PIL
+
+from benchmarks import synthetic
+from image_translator.image_translator import ImageTranslator
+from image_translator.utils.profile import Profile
+from image_translator.utils.render import Renderer
+from image_translator.utils.text_binarization import TextBin
+
+short_options = "s:d:r:o:"
+long_options = ["sizes=", "densities=", "repeat=", "output=", "stages=", "ocr=",
+                "detector=", "translate-delay=", "seed="]
+
+STAGES = ('textbin', 'paragraph', 'ocr', 'wrap', 'render', 'render_tiled', 'pipeline')
+SIZES = [(1000, 800), (2000, 1500), (6000, 800)]
+DENSITIES = [0.3, 1.0]
+
+
+def measure(run: Callable[[Any], Any], repeat: int,
+            setup: Callable[[], Any] = lambda: None, warmup: int = 1) -> Dict[str, float]:
+    """
+    Time run(setup()) repeat times, the setup isn't timed.
+    Return the median and the minimum in seconds.\n
+    warmup: untimed runs first, to fill the caches of fonts and models\n
+    """
+    for _ in range(warmup):
+        run(setup())
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        then = default_timer()
+        run(state)
+        times.append(default_timer() - then)
+    return {'median': statistics.median(times), 'min': min(times)}
+
+
+def new_translator(img: np.ndarray, ocr: str) -> ImageTranslator:
+    return ImageTranslator(img, ocr, 'synthetic', 'eng', 'fra')
+
+
+def run_case(img: np.ndarray, ocr: str, stages: List[str], repeat: int) -> Dict[str, Dict]:
+    """
+    Time the stages on one image. The fixtures of the stages are the
+    paragraphs of one processing of the image.
+    """
+    translator = new_translator(img, ocr)
+    # The paragraph split writes the text pixels in the mask, it gets a copy on each run
+    mask = translator.detect()
+    translator.processing()
+    counts = translator.get_profile()['counts']
+    paragraphs = translator.get_text()
+    texts = [paragraph for paragraph in paragraphs if paragraph['text'] != '']
+
+    def detect_paragraph(_):
+        translator.profile = Profile()
+        translator.mask_paragraph = mask.copy()
+        translator.detect_paragraphs()
+
+    fixtures: Dict[str, Tuple[Callable[[Any], Any], Callable[[], Any]]] = {
+        'textbin': (lambda _: [TextBin(paragraph['image']).run() for paragraph in paragraphs],
+                    lambda: None),
+        # Includes the binarization of the paragraphs
+        'paragraph': (detect_paragraph, lambda: None),
+        'ocr': (lambda _: [translator.ocr_engine.recognize(paragraph['bin_image'])
+                           for paragraph in paragraphs], lambda: None),
+        'wrap': (lambda _: [Renderer(fit_text=True).layout(paragraph) for paragraph in texts],
+                 lambda: None),
+        'render': (lambda out: Renderer().render(out, texts), lambda: img.copy()),
+        'render_tiled': (lambda out: Renderer().render_tiled(out, texts, 1024), lambda: img.copy()),
+        'pipeline': (lambda pipeline: pipeline.translate(), lambda: new_translator(img, ocr)),
+    }
+
+    results: Dict[str, Dict] = {'counts': counts}
+    for stage in stages:
+        run, setup = fixtures[stage]
+        results[stage] = measure(run, repeat, setup)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes: List[Tuple[int, int]] = SIZES, densities: List[float] = DENSITIES,
+        repeat: int = 3, stages: List[str] = list(STAGES), ocr: str = 'synthetic',
+        detector: str = 'synthetic', translate_delay: float = 0.0, seed: int = 0) -> Dict:
+    """
+    Run the benchmark and return the results as a dict:
+    {'meta': {...}, 'results': [{'case', 'stage', 'median', 'min', ...}]}\n
+    ocr: 'synthetic' or a registered ocr, see utils.ocr_engines\n
+    detector: 'synthetic' or 'craft'\n
+    translate_delay: time spent by each translation request in seconds\n
+    """
+    stand_ins = synthetic.install(detector == 'synthetic', ocr == 'synthetic', translate_delay)
+    meta = {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(), 'python': platform.python_version(),
+            'platform': platform.platform(), 'numpy': np.__version__,
+            'opencv': cv2.__version__, 'pillow': PIL.__version__,
+            'repeat': repeat, 'seed': seed, 'ocr': ocr, 'detector': detector,
+            'translate_delay': translate_delay, 'stand_ins': stand_ins}
+
+    results = []
+    for height, width in sizes:
+        for density in densities:
+            img = synthetic.text_image(height, width, density, seed)[0]
+            case = f'{height}x{width}@{density:g}'
+            stage_results = run_case(img, ocr, stages, repeat)
+            counts = stage_results.pop('counts')
+            for stage, result in stage_results.items():
+                results.append({'case': case, 'height': height, 'width': width,
+                                'density': density, 'stage': stage, 'repeat': repeat,
+                                **result, 'paragraphs': counts['paragraphs'],
+                                'words': counts['words']})
+    return {'meta': meta, 'results': results}
+
+
+def main():
+    try:
+        arguments, values = getopt.gnu_getopt(sys.argv[1:], short_options, long_options)
+    except getopt.error as err:
+        print(str(err))
+        sys.exit(2)
+
+    options: Dict[str, Any] = {}
+    output = None
+    for arg, value in arguments:
+        if arg in ("-s", "--sizes"):
+            options['sizes'] = [tuple(int(side) for side in size.split('x')) for size in value.split(',')]
+        elif arg in ("-d", "--densities"):
+            options['densities'] = [float(density) for density in value.split(',')]
+        elif arg in ("-r", "--repeat"):
+            options['repeat'] = int(value)
+        elif arg in ("-o", "--output"):
+            output = value
+        elif arg == "--stages":
+            options['stages'] = value.split(',')
+            for stage in options['stages']:
+                if stage not in STAGES:
+                    print(f'Unknown stage {stage}, the stages are {", ".join(STAGES)}')
+                    sys.exit(2)
+        elif arg == "--ocr":
+            options['ocr'] = value
+        elif arg == "--detector":
+            options['detector'] = value
+        elif arg == "--translate-delay":
+            options['translate_delay'] = float(value)
+        elif arg == "--seed":
+            options['seed'] = int(value)
+
+    report = run(**options)
+    for result in report['results']:
+        print(f"{result['case']:>16} {result['stage']:>12}: {result['median'] * 1000:9.2f} ms "
+              f"(min {result['min'] * 1000:.2f} ms, {result['paragraphs']} paragraphs)")
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Generated text images and local stand-ins for the models, so the
+benchmarks give the same input and the same work on every machine.
+"""
+
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from image_translator.types import Word
+from image_translator.utils import detection
+from image_translator.utils import model_registry
+from image_translator.utils import ocr_engines
+from image_translator.utils import translators
+
+WORDS = ('the', 'image', 'translator', 'reads', 'each', 'paragraph', 'of', 'text',
+         'and', 'draws', 'its', 'translation', 'on', 'a', 'clean', 'background')
+
+
+def text_image(height: int = 2000, width: int = 1500, density: float = 1.0,
+               seed: int = 0) -> Tuple[np.ndarray, List[List[int]]]:
+    """
+    Generate a page of text paragraphs on a light background. Return the
+    image and the boxes [x_min, x_max, y_min, y_max] of the text lines.\n
+    density: fraction of the page height covered by paragraphs\n
+    seed: the same seed gives the same image\n
+    """
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), 235, np.uint8)
+    # Light noise so the binarization doesn't work on flat colors
+    img -= rng.integers(0, 20, (height, width, 1), np.uint8)
+
+    boxes: List[List[int]] = []
+    y = 40
+    while y < height - 80:
+        scale = float(rng.uniform(0.6, 1.4))
+        line_height = int(40 * scale)
+        lines = int(rng.integers(2, 6))
+        color = tuple(int(value) for value in rng.integers(0, 90, 3))
+        x = int(rng.integers(20, max(21, width // 4)))
+        for _ in range(lines):
+            if y + line_height > height - 40:
+                break
+            text = ' '.join(rng.choice(WORDS, int(rng.integers(3, 8))))
+            (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+            cv2.putText(img, text, (x, y + text_height), cv2.FONT_HERSHEY_SIMPLEX, scale, color, 2)
+            boxes.append([x, min(x + text_width, width - 1), y, y + text_height + baseline])
+            y += line_height
+        # The gap between the paragraphs sets the density
+        y += int(line_height * lines * (1 / max(density, 0.05) - 1)) + 2 * line_height
+    return img, boxes
+
+
+def component_boxes(img: np.ndarray, join: Tuple[int, int] = (25, 5)) -> List[List[int]]:
+    """
+    Boxes of the dark blobs joined horizontally into words or lines,
+    a cheap and deterministic stand-in for the CRAFT detection
+    """
+    grey = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    dark = (grey < 128).astype(np.uint8)
+    if join[0] > 1:
+        dark = cv2.dilate(dark, np.ones((join[1], join[0]), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(dark)
+    return [[int(x), int(x + w), int(y), int(y + h)] for x, y, w, h, _ in stats[1:count]]
+
+
+def box_text(box: List[int]) -> str:
+    """Text read in a box [x_min, x_max, y_min, y_max], named by its size"""
+    return f'w{box[1] - box[0]}x{box[3] - box[2]}'
+
+
+def easyocr_item(box: List[int]) -> Tuple[List[List[int]], str, float]:
+    """EasyOCR result of a box [x_min, x_max, y_min, y_max]"""
+    points = [[box[0], box[2]], [box[1], box[2]], [box[1], box[3]], [box[0], box[3]]]
+    return (points, box_text(box), 0.9)
+
+
+class ComponentReader():
+    """
+    EasyOCR reader stand-in, detect returns the text lines and the
+    recognition reads each blob as a word named by its size\n
+    join: size of the blobs joined into a word by readtext\n
+    """
+
+    def __init__(self, join: Tuple[int, int] = (9, 3)):
+        self.join = join
+
+    def detect(self, img: np.ndarray, **kwargs) -> Tuple[List, List]:
+        return component_boxes(img), []
+
+    def readtext(self, img: np.ndarray, **kwargs) -> List:
+        return [easyocr_item(box) for box in component_boxes(img, self.join)]
+
+    def recognize(self, img: np.ndarray, horizontal_list: List, free_list: List, **kwargs) -> List:
+        return [easyocr_item(box) for box in horizontal_list] + \
+            [(box, box_text(detection.free_box_rect(box)), 0.9) for box in free_list]
+
+
+class ComponentOCR(ocr_engines.OCREngine):
+    """OCR engine stand-in reading the blobs of the binarized crops"""
+    name = 'synthetic'
+    lang_index = 0
+
+    def recognize(self, crop: np.ndarray) -> List[Word]:
+        return ocr_engines.convert_easyocr_output(
+            [easyocr_item(box) for box in component_boxes(crop, (9, 3))])
+
+
+def install(detector: bool = True, ocr: bool = True,
+            translate_delay: float = 0.0) -> Dict[str, str]:
+    """
+    Replace the CRAFT detection, register the 'synthetic' OCR engine and
+    the 'synthetic' translator. Return the names of the stages using a stand-in.\n
+    translate_delay: time spent by each translation request in seconds\n
+    """
+    installed = {}
+    if detector:
+        model_registry.READERS = model_registry.ReaderRegistry(
+            loader=lambda *key: ComponentReader(), sizer=lambda reader: 0)
+        installed['detect'] = 'synthetic'
+    if ocr:
+        ocr_engines.register('synthetic', ComponentOCR)
+        installed['ocr'] = 'synthetic'
+    translators.register('synthetic', lambda: translators.OfflineBackend(delay=translate_delay))
+    installed['translate'] = 'synthetic'
+    return installed
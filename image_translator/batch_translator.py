@@ -0,0 +1,174 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from timeit import default_timer
+import traceback
+import getopt
+import os
+import sys
+
+import cv2
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tif', '.tiff')
+
+short_options = "w:o:t:s:d:"
+long_options = ["workers=", "ocr=", "translator=", "src=", "dest=",
+                "gpu", "inpainting", "cache=", "detect-max-side=", "tile-height=", "lean"]
+
+
+class BatchResult(NamedTuple):
+    path: str
+    output: Optional[str]
+    error: Optional[str]
+    seconds: float
+
+
+# Options of the worker, set by the initializer
+_options: Dict[str, Any] = {}
+_cache = None
+
+
+def _init_worker(options: Dict[str, Any]):
+    """
+    Initialize a worker, the OCR models are loaded once per worker
+    """
+    global _options, _cache
+    from image_translator.image_translator import ImageTranslator
+    from image_translator.utils.cache import TranslationCache
+
+    cache_path = options.pop('cache_path', None)
+    _options = options
+    if cache_path is not None:
+        _cache = TranslationCache(path=cache_path)
+    ImageTranslator.warmup(options['ocr'], options['src_lang'], options.get('gpu', False))
+
+
+def _translate_file(path: str, output: str) -> BatchResult:
+    from image_translator.image_translator import ImageTranslator
+
+    then = default_timer()
+    try:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError(f'Unable to read {path}')
+        translator = ImageTranslator(img, cache=_cache, **_options)
+        if not cv2.imwrite(output, translator.translate()):
+            raise ValueError(f'Unable to write {output}')
+    except Exception:
+        return BatchResult(path, None, traceback.format_exc(), default_timer() - then)
+    return BatchResult(path, output, None, default_timer() - then)
+
+
+def list_images(in_dir: str) -> Iterator[str]:
+    """List the images of a directory"""
+    for name in sorted(os.listdir(in_dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            yield os.path.join(in_dir, name)
+
+
+def translate_images(paths: Iterable[str], out_dir: str, ocr: str, translator: str,
+                     src_lang: str, dest_lang: str, workers: Optional[int] = None,
+                     cache_path: Optional[str] = None, **kwargs) -> Iterator[BatchResult]:
+    """
+    Translate images in a pool of processes and yield the results as they finish.
+    The failure of an image doesn't stop the other images.\n
+    paths: paths of the input images\n
+    out_dir: directory of the translated images, same file names as the input\n
+    workers: number of processes, the number of cpus by default\n
+    cache_path: SQLite translation cache shared by the workers\n
+    kwargs: other arguments of ImageTranslator (gpu, inpainting, detect_max_side...)\n
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    options = dict(ocr=ocr, translator=translator, src_lang=src_lang,
+                   dest_lang=dest_lang, cache_path=cache_path, **kwargs)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(options,)) as executor:
+        futures = {executor.submit(_translate_file, path,
+                                   os.path.join(out_dir, os.path.basename(path))): path
+                   for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception:
+                # The worker died (e.g. killed by the OOM killer)
+                yield BatchResult(futures[future], None, traceback.format_exc(), 0.0)
+
+
+def usage():
+    print('Usage: image-translator batch IN_DIR OUT_DIR [--workers N] [--ocr tesseract|easyocr]\n'
+          '                        [--translator google|bing|deepl|offline] [--src eng] [--dest fra]\n'
+          '                        [--gpu] [--inpainting] [--cache FILE] [--detect-max-side N]\n'
+          '                        [--tile-height N] [--lean]')
+
+
+def main():
+    args = sys.argv[1:]
+
+    try:
+        arguments, values = getopt.gnu_getopt(args, short_options, long_options)
+    except getopt.error as err:
+        print(str(err))
+        sys.exit(2)
+
+    if len(values) != 3 or values[0] != 'batch':
+        usage()
+        sys.exit(2)
+    in_dir, out_dir = values[1:]
+
+    options: Dict[str, Any] = dict(ocr='tesseract', translator='google',
+                                   src_lang='eng', dest_lang='fra')
+    workers = None
+    for arg, value in arguments:
+        if arg in ("-w", "--workers"):
+            workers = int(value)
+        elif arg in ("-o", "--ocr"):
+            options['ocr'] = value
+        elif arg in ("-t", "--translator"):
+            options['translator'] = value
+        elif arg in ("-s", "--src"):
+            options['src_lang'] = value
+        elif arg in ("-d", "--dest"):
+            options['dest_lang'] = value
+        elif arg == "--gpu":
+            options['gpu'] = True
+        elif arg == "--inpainting":
+            options['inpainting'] = True
+        elif arg == "--cache":
+            options['cache_path'] = value
+        elif arg == "--detect-max-side":
+            options['detect_max_side'] = int(value)
+        elif arg == "--tile-height":
+            options['tile_height'] = int(value)
+        elif arg == "--lean":
+            options['lean'] = True
+
+    failed = 0
+    for result in translate_images(list_images(in_dir), out_dir, workers=workers, **options):
+        if result.error is None:
+            print(f'{result.path} -> {result.output} ({result.seconds:.1f} s)')
+        else:
+            failed += 1
+            print(f'Error: {result.path}\n{result.error}')
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import List, Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+import tracemalloc
 from image_translator.types import Paragraph, Word
 
 # Image
@@ -21,71 +23,33 @@ import cv2
 import numpy as np
 
 import PIL.Image as PIL_Img
-import PIL.ImageFont as PIL_ImgFont
-import PIL.ImageDraw as PIL_ImgDraw
+from image_translator.utils.render import Renderer
 
 
-# OCR
-import easyocr
-import pytesseract
+# OCR, the backends are imported when they are first used
+from image_translator.utils import ocr_engines
+from image_translator.utils.ocr_engines import OCREngine
+# Moved to the tesseract module, still importable from here
+from image_translator.utils.tesseract import convert_tesserract_output  # noqa: F401
 from image_translator.utils.text_binarization import TextBin
+from image_translator.utils import model_registry
+from image_translator.utils import detection
 # Translator
-from googletrans import Translator
-from image_translator.utils.bing import Bing
-from image_translator.utils.deepl import DeepL
-from image_translator.utils import lang
-
-import sys
+from image_translator.utils import translators
+from image_translator.utils.translators import UnknownTranslator, TranslatorBackend
+from image_translator.utils.cache import TranslationCache
+from image_translator.utils.profile import Profile, timed
 
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
 import urllib.request
 
 # Logging
 import logging
-
-logFormatter = logging.Formatter(
-    "[%(asctime)s] "
-    "[%(levelname)-5.5s]: "
-    "%(message)s")
 log = logging.getLogger('image_translator')
 
-streamHandler = logging.StreamHandler()
-streamHandler.setFormatter(logFormatter)
-log.addHandler(streamHandler)
-
-log.setLevel(logging.DEBUG)
-
-if sys.platform == 'win32':
-    pytesseract.pytesseract.tesseract_cmd = 'tesseract-ocr/tesseract.exe'
-
-TRANS = {
-    'google': 0,
-    'bing': 1,
-    'deepl': 2
-}
-OCR = {
-    'tesseract': 0,
-    'easyocr': 1
-}
-
-
-def convert_tesserract_output(data, x: int, y: int) -> List[Word]:
-    word: List[Word] = []
-    for item in zip(data['text'], data['left'], data['top'], data['width'], data['height']):
-        if item[0] != '':
-            x1: int = item[1] + x
-            y1: int = item[2] + y
-            x2: int = item[3] + x1
-            y2: int = item[4] + y1
-            word.append({
-                'text': item[0],
-                'x1': x1 - 6,
-                'y1': y1 - 6,
-                'x2': x2 + 6,
-                'y2': y2 + 6,
-                'w': item[3] + 6,
-                'h': item[4] + 6
-            })
-    return word
+# Height of the tiles rendered at once in the memory-lean mode
+LEAN_TILE_HEIGHT = 1024
 
 
 class UnknownLanguage(Exception):
@@ -99,19 +63,42 @@ class ImageTranslator():
 
     def __init__(self, img: Union[PIL_Img.Image, np.ndarray, str], ocr: str,
                  translator: str, src_lang: str, dest_lang: str,
-                 gpu: bool = False, inpainting: bool = False):
+                 gpu: bool = False, inpainting: bool = False,
+                 cache: Optional[TranslationCache] = None, fit_text: bool = False,
+                 single_pass: bool = False, detect_max_side: Optional[int] = None,
+                 detect_scale: float = 1.0, tile_height: Optional[int] = None,
+                 tile_overlap: int = 200, lean: bool = False, track_memory: bool = False,
+                 release_crops: bool = False, min_confidence: Optional[float] = None,
+                 on_profile: Optional[Callable[[Dict], None]] = None):
         """
         img: path file, bytes URL, Pillow/OpenCV image and data URI\n
         ocr: 'tesseract' or 'easyocr'\n
-        translator: 'google' , 'bing' and  'deepl'\n
+        translator: 'google' , 'bing',  'deepl' or 'offline'. See utils.translators\n
         src_lang: source language of image. See code in utils.lang\n
         dest_lang: destination language of image. See code in utils.lang\n
+        cache: translation cache shared between the images. See utils.cache\n
+        fit_text: fit the font size of the translation in the paragraph box\n
+        single_pass: run the ocr once per page instead of once per paragraph\n
+        detect_max_side: run the text detection on a copy whose longest side is at most this size\n
+        detect_scale: run the text detection on a copy scaled by this factor\n
+        tile_height: process the image in horizontal tiles of this height, for very tall images\n
+        tile_overlap: overlap of the tiles, larger than the height of a text line and smaller than tile_height\n
+        lean: keep only one writable copy of the image, the output\n
+        track_memory: measure the peak memory of the processing and the translation\n
+        release_crops: drop the paragraph crops once the ocr is done\n
+        min_confidence: minimal confidence of the words between 0 and 100, by default the one of the ocr\n
+        on_profile: called with the profile of the image at the end of translate. See utils.profile\n
         """
+        if tile_height is not None:
+            detection.check_tile_overlap(tile_height, tile_overlap)
         self.img: np.ndarray = ImageTranslator.reformat_input(img)
         self.img_out: Optional[np.ndarray] = None
         self.img_process: Optional[np.ndarray] = None
         self.text: List[Paragraph] = []
         self.mask_paragraph: Optional[np.ndarray] = None
+        # Boxes of the text detection
+        self.horizontal_list: List = []
+        self.free_list: List = []
         self.ocr: str = ocr
         self.translator: str = translator
         self.src_lang: str = src_lang
@@ -121,254 +108,439 @@ class ImageTranslator():
         self.trans_dest_lang: str = ''
 
         self.gpu = gpu
+        self.cache: Optional[TranslationCache] = cache
+        self.renderer: Renderer = Renderer(fit_text=fit_text)
+        self.single_pass: bool = single_pass
+        self.detect_max_side: Optional[int] = detect_max_side
+        self.detect_scale: float = detect_scale
+        self.tile_height: Optional[int] = tile_height
+        self.tile_overlap: int = tile_overlap
+        # The tiled mode never copies more than the output
+        self.lean: bool = lean or tile_height is not None
+        self.track_memory: bool = track_memory
+        # Peak memory allocated by the last processing or translation, in bytes
+        self.peak_memory: Optional[int] = None
+        self.release_crops: bool = release_crops
+        # Time of the stages and counters of the last processing
+        self.profile: Profile = Profile()
+        self.on_profile: Optional[Callable[[Dict], None]] = on_profile
+        # The inpainting reads the binarized paragraphs in translate
+        self.inpainting: bool = inpainting
 
         # Test the language code for ocr and translator
         try:
-            self.ocr_lang = lang.OCR_LANG[self.src_lang][OCR[self.ocr]]
+            self.ocr, self.ocr_lang = ImageTranslator.ocr_language(self.ocr, self.src_lang)
         except KeyError:
             log.error(f'Language {self.src_lang} is not available')
             raise UnknownLanguage(f'Language {self.src_lang} is not available')
-        if self.ocr_lang == 'invalid':
-            log.warning(f'The {self.ocr} ocr has no {self.src_lang}.'
-                        f'Switch to tesseract')
-            self.ocr = 'tesseract'
+        self.ocr_engine: OCREngine = ocr_engines.get(self.ocr, self.ocr_lang, gpu)
+        self.min_confidence: float = self.ocr_engine.min_confidence \
+            if min_confidence is None else min_confidence
 
         try:
-            self.trans_src_lang = lang.TRANS_LANG[self.src_lang][TRANS[self.translator]]
-            self.trans_dest_lang = lang.TRANS_LANG[self.dest_lang][TRANS[self.translator]]
+            self.backend: TranslatorBackend = translators.get(self.translator)
+        except UnknownTranslator:
+            log.error(f'Translator {self.translator} is not available')
+            raise
+        try:
+            self.trans_src_lang = self.backend.lang_code(self.src_lang)
+            self.trans_dest_lang = self.backend.lang_code(self.dest_lang)
         except KeyError:
             log.error(f'Language {self.dest_lang} is not available')
             raise UnknownLanguage(
                 f'Language {self.dest_lang} is not available')
-        if src_lang == 'invalid' or dest_lang == 'invalid':
+        if self.trans_src_lang == 'invalid' or self.trans_dest_lang == 'invalid':
             log.warning(f'The {self.translator} translator has no {self.src_lang}'
                         f'or {self.dest_lang}.Switch to google')
-            self.trans_src_lang = lang.TRANS_LANG[self.src_lang][TRANS['google']]
-            self.trans_dest_lang = lang.TRANS_LANG[self.dest_lang][TRANS['google']]
             self.translator = 'google'
+            self.backend = translators.get(self.translator)
+            self.trans_src_lang = self.backend.lang_code(self.src_lang)
+            self.trans_dest_lang = self.backend.lang_code(self.dest_lang)
 
         if inpainting:
             self.remove_text = self.__inpainting
         else:
             self.remove_text = self.__draw_rectangle
 
+    @staticmethod
+    def ocr_language(ocr: str, src_lang: str) -> Tuple[str, str]:
+        """
+        Return the ocr and its code of the language, tesseract when
+        the ocr doesn't have the language. Raise KeyError for an unknown language.
+        """
+        ocr_lang = ocr_engines.engine_class(ocr).lang_code_of(src_lang)
+        if ocr_lang == 'invalid':
+            log.warning(f'The {ocr} ocr has no {src_lang}.'
+                        f'Switch to tesseract')
+            ocr = 'tesseract'
+            ocr_lang = ocr_engines.engine_class(ocr).lang_code_of(src_lang)
+        return ocr, ocr_lang
+
+    @staticmethod
+    def warmup(ocr: str, src_lang: str, gpu: bool = False):
+        """
+        Load the models used for the ocr and the language,
+        meant to be called once per process at startup
+        """
+        ocr, ocr_lang = ImageTranslator.ocr_language(ocr, src_lang)
+        if ocr != 'easyocr':
+            # The text detection always uses easyocr
+            model_registry.warmup([['en']], gpu=gpu)
+        ocr_engines.get(ocr, ocr_lang, gpu).warmup()
+
     def translate(self) -> np.ndarray:
         """Processing of the input image and
         direct translation"""
 
         if self.img_process is None:
             self.processing()
-        self.img_out = self.img_process.copy()
-        log.debug('Apply translation to image')
-        for item in self.text:
-            self.remove_text(item, self.img_out)
-            if item['text'] != '':
-                self.__apply_translation(item)
+        with self.__memory_tracking('translation'):
+            self.img_out = self.img_process.copy()
+            log.debug('Apply translation to image')
+            for item in self.text:
+                self.remove_text(item, self.img_out)
+            with self.profile.stage('render'):
+                if self.lean:
+                    # Only a tile is converted to PIL, the output is drawn in place
+                    self.img_out = self.renderer.render_tiled(
+                        self.img_out, self.text, self.tile_height or LEAN_TILE_HEIGHT)
+                else:
+                    self.img_out = self.renderer.render(self.img_out, self.text)
+        if self.on_profile is not None:
+            self.on_profile(self.get_profile())
         return self.img_out
 
+    def get_profile(self) -> Dict[str, Dict]:
+        """Return the time of the stages and the counters of the image"""
+        return self.profile.to_dict()
+
     def get_text(self) -> List[Paragraph]:
         """Return the text list"""
         return self.text
 
-    def processing(self):
-        """Process the input image to detect text
-        and pass it to the ocr """
-
-        # Retrieve paragraph mask of the image
-        self.img_process = self.img.copy()
+    def detect(self) -> Optional[np.ndarray]:
+        """
+        Run the text detection, return the paragraph mask,
+        None in tiled mode
+        """
         self.mask_paragraph = self.__detect_text(self.img)
+        return self.mask_paragraph
 
-        # Split all paragraph into a list
-        paragraphs: List[Paragraph] = self.__detect_paragraph()
-
-        # Apply Binarization and ocr
-        for paragraph in paragraphs:
-            self.text.append(self.__run_ocr(paragraph))
+    def detect_paragraphs(self) -> List[Paragraph]:
+        """
+        Split the detected text into binarized paragraphs,
+        the paragraph mask is replaced by the text pixels
+        """
+        return self.__detect_paragraph()
 
-        # Run translator
-        for item in self.text:
-            if item['text'] != '':
-                # Run the translator
-                item['translated_text'] = self.run_translator(
-                    item['text'])
-                self.remove_text(item, self.img_process)
+    def processing(self):
+        """Process the input image to detect text
+        and pass it to the ocr """
+        self.profile = Profile()
+        with self.__memory_tracking('processing'):
+            # Retrieve paragraph mask of the image
+            self.img_process = self.__process_image()
+            self.detect()
+
+            # Split all paragraph into a list
+            paragraphs: List[Paragraph] = self.detect_paragraphs()
+
+            # Apply Binarization and ocr
+            if self.single_pass:
+                self.text = self.__run_ocr_page(paragraphs)
+            else:
+                for paragraph in paragraphs:
+                    self.text.append(self.__run_ocr(paragraph))
+            for paragraph in self.text:
+                self.__release_crops(paragraph)
+
+            # Run translator on all the paragraphs at once
+            items = [item for item in self.text if item['text'] != '']
+            translated = self.run_translator_batch([item['text'] for item in items])
+            for item, translated_text in zip(items, translated):
+                item['translated_text'] = translated_text
+                if not self.lean:
+                    self.remove_text(item, self.img_process)
+            self.__count_text()
+
+    async def aprocess(self, ocr_concurrency: int = 2, translate_concurrency: int = 4,
+                       executor: Optional[Executor] = None):
+        """
+        Asynchronous version of processing. The OCR of each paragraph runs
+        in an executor and the translation of a paragraph starts as soon as
+        its OCR is done, so it overlaps with the OCR of the next paragraphs.\n
+        ocr_concurrency: maximal number of paragraphs in the OCR at the same time\n
+        translate_concurrency: maximal number of translator calls at the same time\n
+        executor: executor running the stages, a thread pool by default\n
+        """
+        loop = asyncio.get_running_loop()
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=ocr_concurrency + translate_concurrency)
+
+        ocr_limit = asyncio.Semaphore(ocr_concurrency)
+        translate_limit = asyncio.Semaphore(translate_concurrency)
+
+        async def run(paragraph: Paragraph) -> Paragraph:
+            if 'text' not in paragraph:
+                async with ocr_limit:
+                    paragraph = await loop.run_in_executor(executor, self.__run_ocr, paragraph)
+            self.__release_crops(paragraph)
+            if paragraph['text'] != '':
+                async with translate_limit:
+                    paragraph['translated_text'] = await loop.run_in_executor(
+                        executor, self.run_translator, paragraph['text'])
+            return paragraph
+
+        self.profile = Profile()
+        try:
+            with self.__memory_tracking('processing'):
+                # Retrieve paragraph mask of the image
+                self.img_process = self.__process_image()
+                await loop.run_in_executor(executor, self.detect)
+
+                # Split all paragraph into a list
+                paragraphs: List[Paragraph] = await loop.run_in_executor(executor, self.detect_paragraphs)
+
+                if self.single_pass:
+                    paragraphs = await loop.run_in_executor(executor, self.__run_ocr_page, paragraphs)
+
+                # The paragraphs keep their order
+                self.text = list(await asyncio.gather(*[run(paragraph) for paragraph in paragraphs]))
+                if not self.lean:
+                    for item in self.text:
+                        if item['text'] != '':
+                            self.remove_text(item, self.img_process)
+                self.__count_text()
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False)
+
+    def __count_text(self):
+        self.profile.count('paragraphs', len(self.text))
+        self.profile.count('words', sum(len(item.get('word_list', [])) for item in self.text))
+
+    def __release_crops(self, paragraph: Paragraph):
+        """
+        Drop the crops of an ocr-ed paragraph when release_crops is set
+        """
+        if not self.release_crops:
+            return
+        if 'image' in paragraph:
+            del paragraph['image']
+        if 'bin_image' in paragraph and not self.inpainting:
+            del paragraph['bin_image']
+
+    @contextmanager
+    def __memory_tracking(self, stage: str) -> Iterator[None]:
+        """
+        Measure the peak memory allocated in the block when track_memory is set,
+        the numpy and opencv buffers are traced by tracemalloc
+        """
+        if not self.track_memory:
+            yield
+            return
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            if started:
+                tracemalloc.stop()
+            self.peak_memory = max(peak, self.peak_memory or 0)
+            log.info(f'Peak memory of the {stage}: {peak / 2 ** 20:.1f} MiB')
+
+    def __process_image(self) -> np.ndarray:
+        """
+        Return the image the text is removed from. In lean mode it is
+        a read-only view of the input, the text is only removed in
+        translate on its single copy.
+        """
+        if self.lean:
+            view = self.img.view()
+            view.flags.writeable = False
+            return view
+        return self.img.copy()
 
+    @timed('inpaint')
     def __draw_rectangle(self, paragraph: Paragraph, img: np.ndarray):
-        pt1 = (paragraph['x'], paragraph['y'])
-        pt2 = (paragraph['x'] + paragraph['w'], paragraph['y'] + paragraph['h'])
-        cv2.rectangle(self.img_process, pt1, pt2, (255, 255, 255), -1)
+        # The box of the detection holds all the glyphs, the text
+        # position only anchors the translation
+        dx: int = paragraph['dx']
+        dy: int = paragraph['dy']
+        img[dy:dy + paragraph['dh'], dx:dx + paragraph['dw']] = 255
 
+    @timed('inpaint')
     def __inpainting(self, paragraph: Paragraph, img: np.ndarray):
         dx: int = paragraph['dx']
         dy: int = paragraph['dy']
         dw: int = paragraph['dw']
         dh: int = paragraph['dh']
 
-        mask = paragraph['bin_image']
+        # The text pixels are black on the binarized image
+        mask = np.invert(paragraph['bin_image'])
 
         kernel = np.ones((5, 5), np.uint8)
         temp_img = cv2.dilate(mask, kernel, iterations=1)
-        temp_img = cv2.cvtColor(temp_img, cv2.COLOR_BGR2GRAY)
 
-        cv2.inpaint(img[dy:dy + dh, dx:dx + dw], temp_img, 3, cv2.INPAINT_NS)
+        img[dy:dy + dh, dx:dx + dw] = cv2.inpaint(img[dy:dy + dh, dx:dx + dw], temp_img, 3, cv2.INPAINT_NS)
 
-    def __detect_text(self, img: np.ndarray) -> np.ndarray:
+    @timed('detect')
+    def __detect_text(self, img: np.ndarray) -> Optional[np.ndarray]:
         """
-        Return a mask from the text location
+        Return a mask from the text location,
+        None in tiled mode where the paragraphs are grouped from the boxes
         """
         log.debug('Run CRAFT text detector and create mask')
-        blank_image: np.ndarray = np.zeros(
-            (img.shape[0], img.shape[1], 3), np.uint8)
-
-        reader = easyocr.Reader(['en'], gpu=self.gpu,  # Set lang placeholder
-                                model_storage_directory='easyocr/model')
-        boxes = reader.detect(img)[0]
+        # Share the reader with the recognition when easyocr is used
+        detect_lang = self.ocr_lang if self.ocr == 'easyocr' else 'en'
+        reader = model_registry.get_reader([detect_lang], gpu=self.gpu)
+        if self.tile_height is not None:
+            self.horizontal_list, self.free_list = detection.detect_boxes_tiled(
+                reader, img, self.tile_height, self.tile_overlap,
+                self.detect_max_side, self.detect_scale)
+            return None
+
+        self.horizontal_list, self.free_list = detection.detect_boxes(
+            reader, img, self.detect_max_side, self.detect_scale)
+        # The rotated text is kept in the paragraphs by its bounding box
+        boxes = self.horizontal_list + [detection.free_box_rect(box) for box in self.free_list]
+
+        # Binary mask, one channel is enough
+        blank_image: np.ndarray = np.zeros(img.shape[:2], np.uint8)
 
         # Draw a white rectangle on each detection
         for box in boxes:
             point1 = (int(box[0]), int(box[2]))
             point2 = (int(box[1]), int(box[3]))
-            cv2.rectangle(blank_image, point1, point2, (255, 255, 255), -1)
+            cv2.rectangle(blank_image, point1, point2, 255, -1)
 
         return blank_image
 
+    @timed('paragraph')
     def __detect_paragraph(self) -> List[Paragraph]:
         """
         Detect each paragraph with finding coutour
         of the mask_paragraph
         """
         log.debug('Crop each paragraph')
+        if self.mask_paragraph is None:
+            return self.__detect_paragraph_tiled()
+
         paragraph: List = []
-        img: np.ndarray = self.img.copy()
 
         # Find contours
         kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
-        dilated = cv2.dilate(cv2.cvtColor(self.mask_paragraph,
-                             cv2.COLOR_BGR2GRAY), kernel, iterations=9)
+        dilated = cv2.dilate(self.mask_paragraph, kernel, iterations=9)
         contours, hierarchy = cv2.findContours(dilated, cv2.RETR_EXTERNAL,
                                                cv2.CHAIN_APPROX_NONE)
 
         # Crop the image to get only text
         for contour in contours:
-
             [x, y, w, h] = cv2.boundingRect(contour)
             cropped_mask = self.mask_paragraph[y:y + h, x:x + w]
-            cropped: np.ndarray = img[y:y + h, x:x + w]
+            paragraph.append(self.__extract_paragraph(x, y, w, h, cropped_mask))
+        return paragraph
 
-            cropped = cv2.bitwise_and(
-                cropped,
-                cropped_mask)
+    def __detect_paragraph_tiled(self) -> List[Paragraph]:
+        """
+        Group the detected boxes into paragraphs, the mask
+        is only allocated at the size of each paragraph
+        """
+        paragraph: List = []
+        detected = self.horizontal_list + [detection.free_box_rect(box) for box in self.free_list]
+        for [x, y, w, h], boxes in detection.group_boxes(detected, self.img.shape):
+            cropped_mask = np.zeros((h, w), np.uint8)
+            for box in boxes:
+                point1 = (int(box[0]) - x, int(box[2]) - y)
+                point2 = (int(box[1]) - x, int(box[3]) - y)
+                cv2.rectangle(cropped_mask, point1, point2, 255, -1)
+            paragraph.append(self.__extract_paragraph(x, y, w, h, cropped_mask))
+        return paragraph
 
+    def __extract_paragraph(self, x: int, y: int, w: int, h: int,
+                            cropped_mask: np.ndarray) -> Paragraph:
+        """
+        Crop and binarize one paragraph, the cropped mask
+        is replaced by the mask of the text pixels
+        """
+        # bitwise_and returns a new image, the source image is only read
+        source = self.img[y:y + h, x:x + w]
+        cropped: np.ndarray = cv2.bitwise_and(source, source, mask=cropped_mask)
+
+        with self.profile.stage('binarize'):
             binary = TextBin(cropped)
             bin_image = binary.run()
 
-            indices = np.where(bin_image == [0])
-            coordinates = tuple(zip(indices[0], indices[1]))
-            bgr_mask = cv2.cvtColor(np.invert(bin_image), cv2.COLOR_GRAY2BGR)
-            self.mask_paragraph[y:y + h, x:x + w] = bgr_mask
-            # Reverse the numpy array to get RGB color and not BGR
-            # Note: BGR format is the default format for opencv
-            text_color = tuple(np.flip(cropped[coordinates[0]]))
-
-            # Apply binarization
-            paragraph.append({
-                'image': cropped,
-                'bin_image': bin_image,
-                'text_color': text_color,
-                'dx': x,
-                'dy': y,
-                'dw': w,
-                'dh': h
-            })
-        return paragraph
-
+        indices = np.where(bin_image == [0])
+        coordinates = tuple(zip(indices[0], indices[1]))
+        cropped_mask[:] = np.invert(bin_image)
+        # Reverse the numpy array to get RGB color and not BGR
+        # Note: BGR format is the default format for opencv
+        text_color = tuple(np.flip(cropped[coordinates[0]]))
+
+        # Apply binarization
+        return Paragraph(
+            image=cropped,
+            bin_image=bin_image,
+            text_color=text_color,
+            w=w,
+            h=h,
+            dx=x,
+            dy=y,
+            dw=w,
+            dh=h
+        )
+
+    @timed('ocr')
     def __run_ocr(self, paragraph: Paragraph) -> Paragraph:
         """
         Run the selected OCR
         """
 
         log.debug(f'Run {self.ocr} ocr')
-        if self.ocr == 'easyocr':
-            return self.__run_easyocr(paragraph, self.ocr_lang)
-        elif self.ocr == 'tesseract':
-            return self.__run_tesserract(paragraph, self.ocr_lang)
+        words: List[Word] = self.ocr_engine.recognize(paragraph['bin_image'])
+        return ocr_engines.fill_paragraph(paragraph, words, self.min_confidence)
 
-    def __run_tesserract(self, paragraph: Paragraph, lang_code: str) -> Paragraph:
+    @timed('ocr')
+    def __run_ocr_page(self, paragraphs: List[Paragraph]) -> List[Paragraph]:
         """
-        Run tesserract ocr
+        Run the selected OCR once for all the paragraphs, each paragraph
+        gets the boxes of the text detection inside it
         """
-        boxes = pytesseract.image_to_data(
-            paragraph['bin_image'], lang=lang_code, output_type=pytesseract.Output.DICT)
-        dx: int = paragraph['dx']
-        dy: int = paragraph['dy']
-        words: List[Word] = convert_tesserract_output(boxes, dx, dy)
-
-        x = words[0]['x1']
-        y = words[0]['y1']
-        text: str = ''
-        for item in words:
-            text += item['text']
-            text += ' '
-
-        paragraph['x'] = x - 40
-        paragraph['y'] = y - 15
-        paragraph['word_list'] = words
-        paragraph['max_width'] = paragraph['w']
-        # Only for Cantarell -> Find a solution for all fonts
-        paragraph['font_size'] = int(words[0]['h']*1.1)
-        paragraph['text'] = text
 
-        return paragraph
-
-    def __run_easyocr(self, paragraph: Paragraph, lang_code: str) -> Paragraph:
-        """
-        Run EasyOCR
-        """
-        reader = easyocr.Reader([lang_code], gpu=self.gpu,
-                                model_storage_directory='easyocr/model')
-        result: List = reader.readtext(paragraph['bin_image'])
-        # 1|----------------------------|2
-        #  |                            |
-        # 4|----------------------------|3
-        # [[[x1,y1],[x2,y2][x3,y3],[x4,y4],text],confidence]
-
-        dx: int = paragraph['dx']
-        dy: int = paragraph['dy']
-
-        words: List[Word] = []
-        for item in result:
-
-            point1: tuple = item[0][0]
-            point2: tuple = item[0][2]
-            x1: int = point1[0] + dx
-            y1: int = point1[1] + dy
-            words.append({
-                'text': item[1],
-                'x1': x1 - 6,
-                'y1': y1 - 6,
-                'x2': point2[0] + x1 + 6,
-                'y2': point2[1] + y1 + 6,
-                'w': point2[0] - point1[0] + 6,
-                'h': point2[1] - point1[1] + 6
-                })
-
-        text: str = ''
-        for item in words:
-            text += item['text']
-            text += ' '
-
-        x = words[0]['x1']
-        y = words[0]['y1']
-
-        paragraph['x'] = x - 40
-        paragraph['y'] = y - 15
-        paragraph['word_list'] = words
-        paragraph['max_width'] = paragraph['w']
-        # Only for Cantarell -> Find a solution for all fonts
-        paragraph['font_size'] = int(words[0]['h']*1.1)
-        paragraph['text'] = text
-
-        return paragraph
+        log.debug(f'Run {self.ocr} ocr on the page')
+
+        def find(center_x: float, center_y: float) -> Optional[int]:
+            for index, paragraph in enumerate(paragraphs):
+                if paragraph['dx'] <= center_x < paragraph['dx'] + paragraph['dw'] and \
+                   paragraph['dy'] <= center_y < paragraph['dy'] + paragraph['dh']:
+                    return index
+            return None
+
+        boxes: List[List] = [[] for _ in paragraphs]
+        for box in self.horizontal_list:
+            index = find((box[0] + box[1]) / 2, (box[2] + box[3]) / 2)
+            if index is not None:
+                paragraph = paragraphs[index]
+                boxes[index].append([box[0] - paragraph['dx'], box[1] - paragraph['dx'],
+                                     box[2] - paragraph['dy'], box[3] - paragraph['dy']])
+
+        free_boxes: List[List] = [[] for _ in paragraphs]
+        for box in self.free_list:
+            index = find(sum(x for x, _ in box) / 4, sum(y for _, y in box) / 4)
+            if index is not None:
+                paragraph = paragraphs[index]
+                free_boxes[index].append([[x - paragraph['dx'], y - paragraph['dy']] for x, y in box])
+
+        words = self.ocr_engine.recognize_batch([paragraph['bin_image'] for paragraph in paragraphs],
+                                                boxes, free_boxes)
+        return [ocr_engines.fill_paragraph(paragraph, paragraph_words, self.min_confidence)
+                for paragraph, paragraph_words in zip(paragraphs, words)]
 
     @staticmethod
     def reformat_input(image: Union[PIL_Img.Image, np.ndarray, str]) -> np.ndarray:
@@ -399,97 +571,55 @@ class ImageTranslator():
                       'string(file path or url), bytes, numpy array')
         return img
 
-    def __text_wrap(self, text: str, font: PIL_ImgFont.FreeTypeFont, max_width: int) -> List[str]:
-        """
-        Wrap the into multiple lines
-        """
-        lines = []
-        # If the width of the text is smaller than image width
-        # we don't need to split it, just add it to the lines array
-        # and return
-        if font.getsize(text)[0] <= max_width:
-            lines.append(text)
-        else:
-            # split the line by spaces to get words
-            words = text.split(' ')
-            i = 0
-
-            while i < len(words):
-                line = ''
-                while i < len(words) and font.getsize(line + words[i])[0] <= max_width:
-                    line = line + words[i] + " "
-                    i += 1
-                if not line:
-                    line = words[i]
-                    i += 1
-
-                lines.append(line)
-        return lines
-
     def run_translator(self, text: str) -> str:
         """
-        Run translator between Google, Bing and DeepL
+        Run the translator, see utils.translators
         """
         log.debug('Run translator')
-        if self.translator == 'google':
-            return self.__run_google(text, self.trans_dest_lang,
-                                     self.trans_src_lang)
-        elif self.translator == 'bing':
-            return self.__run_bing(text, self.trans_dest_lang,
-                                   self.trans_src_lang)
-        elif self.translator == 'deepl':
-            return self.__run_deepl(text, self.trans_dest_lang,
-                                    self.trans_src_lang)
-
-    def __run_google(self, text: str, dest_lang: str, src_lang: str) -> str:
+        if self.cache is not None:
+            translated = self.cache.get(self.translator, self.trans_src_lang,
+                                        self.trans_dest_lang, text)
+            if translated is not None:
+                self.profile.count('cache_hits')
+                return translated
+            self.profile.count('cache_misses')
+
+        translated = self.__translate(text)
+        if self.cache is not None:
+            self.cache.set(self.translator, self.trans_src_lang,
+                           self.trans_dest_lang, text, translated)
+        return translated
+
+    @timed('translate')
+    def __translate(self, text: str) -> str:
+        self.profile.count('characters', len(text))
+        return self.backend.translate(text, self.trans_src_lang, self.trans_dest_lang)
+
+    def run_translator_batch(self, texts: List[str]) -> List[str]:
         """
-        Run google translator
+        Run translator on a list of texts, the texts are packed
+        in as few requests as the translator allows
         """
-        tra = Translator()
-
-        string = tra.translate(text, dest_lang, src_lang).text
-
-        return string
-
-    def __run_bing(self, text: str, dest_lang: str, src_lang: str) -> str:
-        """
-        Run bing translator
-        """
-        tra = Bing()
-        string = tra.translate(text, src_lang, dest_lang)
-
-        return string
-
-    def __run_deepl(self, text: str, dest_lang: str, src_lang: str) -> str:
-        """
-        Run deepl translator
-        """
-        tra = DeepL(src_lang, dest_lang)
-        string = tra.translate(text)
-
-        return string
-
-    def __apply_translation(self, text: Paragraph):
-        """
-        Apply the translation on img_out
-        """
-        im_pil = PIL_Img.fromarray(self.img_out)
-        draw = PIL_ImgDraw.Draw(im_pil)
-
-        font_file_path = 'font/Cantarell.ttf'
-
-        font = PIL_ImgFont.truetype(
-            font_file_path,
-            size=text['font_size'],
-            encoding="unic")
-
-        lines = self.__text_wrap(
-            text['translated_text'],
-            font,
-            text['max_width'])
-        line_height = font.getsize('hg')[1]
-        y = text['y']
-        for line in lines:
-            draw.text((text['x'], y), line, fill=text['text_color'][::-1], font=font)
-            y = y + line_height
-        self.img_out = np.asarray(im_pil)
+        log.debug(f'Run translator on {len(texts)} texts')
+        if self.cache is None:
+            return self.__translate_batch(texts)
+
+        # Only send the texts missing from the cache
+        results: List[Optional[str]] = [
+            self.cache.get(self.translator, self.trans_src_lang, self.trans_dest_lang, text)
+            for text in texts]
+        missing = [index for index, result in enumerate(results) if result is None]
+        self.profile.count('cache_hits', len(texts) - len(missing))
+        self.profile.count('cache_misses', len(missing))
+        if missing:
+            translated = self.__translate_batch([texts[index] for index in missing])
+            for index, translated_text in zip(missing, translated):
+                results[index] = translated_text
+                self.cache.set(self.translator, self.trans_src_lang,
+                               self.trans_dest_lang, texts[index], translated_text)
+        return results
+
+    @timed('translate')
+    def __translate_batch(self, texts: List[str]) -> List[str]:
+        self.profile.count('characters', sum(len(text) for text in texts))
+        return self.backend.translate_batch(texts, self.trans_src_lang, self.trans_dest_lang)
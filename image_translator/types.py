@@ -1,9 +1,77 @@
-from typing import TypedDict, List, Tuple
+from typing import Any, ClassVar, Iterator, List, Optional, Tuple
 import numpy as np
 
 
-# Dict type to represent a word or words
-class Word(TypedDict):
+# Slotted record with the access of a dict, the existing code
+# reads and writes the fields with paragraph['text']
+class Record():
+    __slots__: Tuple[str, ...] = ()
+    # Slots of the record and of its bases, the only keys of the record
+    _fields: ClassVar[Tuple[str, ...]] = ()
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        fields: List[str] = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(name for name in klass.__dict__.get('__slots__', ()) if name not in fields)
+        cls._fields = tuple(fields)
+
+    def __init__(self, **fields: Any):
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str):
+        if key not in self._fields:
+            raise KeyError(key)
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self._fields and hasattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._fields:
+            return default
+        return getattr(self, key, default)
+
+    def keys(self) -> List[str]:
+        return [key for key in self._fields if hasattr(self, key)]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+
+# Record to represent a word or words
+class Word(Record):
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'w', 'h', 'text', 'line', 'conf')
+
     x1: int
     y1: int
     x2: int
@@ -11,10 +79,30 @@ class Word(TypedDict):
     w: int
     h: int
     text: str
+    line: int  # Line in the paragraph, only set by tesseract
+    conf: float  # Confidence of the ocr between 0 and 100
+
+    # Thousands of words are created per page, the fields are set directly
+    def __init__(self, text: str, x1: int, y1: int, x2: int, y2: int, w: int, h: int,
+                 line: Optional[int] = None, conf: Optional[float] = None):
+        self.text = text
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.w = w
+        self.h = h
+        if line is not None:
+            self.line = line
+        if conf is not None:
+            self.conf = conf
+
 
+# Record for paragraph, the fields are set along the processing
+class Paragraph(Record):
+    __slots__ = ('x', 'y', 'w', 'h', 'dx', 'dy', 'dw', 'dh', 'text', 'image', 'bin_image',
+                 'text_color', 'max_width', 'font_size', 'translated_text', 'word_list')
 
-# Dicty type for paragraph
-class Paragraph(TypedDict):
     x: int  # Position of the text
     y: int
     w: int
@@ -28,5 +116,6 @@ class Paragraph(TypedDict):
     bin_image: np.ndarray
     text_color: Tuple[int, int, int]
     max_width: int
+    font_size: int
     translated_text: str
     word_list: List[Word]
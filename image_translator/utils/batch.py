@@ -0,0 +1,89 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Callable, List, Optional
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+# Translators keep the line breaks, so each text is sent on its own line
+SEPARATOR = '\n'
+
+
+def clean_text(text: str) -> str:
+    """Collapse the whitespaces, the text can't contain the separator anymore"""
+    return ' '.join(text.split())
+
+
+def pack_texts(texts: List[str], max_length: int, separator: str = SEPARATOR) -> List[List[int]]:
+    """
+    Group the indices of the texts into chunks whose joined
+    length doesn't exceed max_length. A text longer than
+    max_length is put alone in its chunk.
+    """
+    chunks: List[List[int]] = []
+    chunk: List[int] = []
+    length = 0
+    for index, text in enumerate(texts):
+        size = len(text) + (len(separator) if chunk else 0)
+        if chunk and length + size > max_length:
+            chunks.append(chunk)
+            chunk = []
+            length = 0
+            size = len(text)
+        chunk.append(index)
+        length += size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def split_text(text: str, count: int, separator: str = SEPARATOR) -> Optional[List[str]]:
+    """
+    Split a translated chunk back into count texts, return None if the
+    translator didn't keep the separators. The texts sent are never empty,
+    an empty part means the lines are no longer aligned.
+    """
+    parts = [part.strip() for part in text.strip().split(separator)]
+    if len(parts) != count or not all(parts):
+        return None
+    return parts
+
+
+def translate_batch(texts: List[str], translate: Callable[[str], str], max_length: int,
+                    separator: str = SEPARATOR) -> List[str]:
+    """
+    Translate a list of texts with as few calls of translate as
+    the max_length allows. Empty texts are not sent.
+    """
+    results: List[str] = [''] * len(texts)
+    indices = [index for index, text in enumerate(texts) if clean_text(text)]
+    cleaned = [clean_text(texts[index]) for index in indices]
+
+    for chunk in pack_texts(cleaned, max_length, separator):
+        translated = translate(separator.join(cleaned[i] for i in chunk))
+        if len(chunk) == 1:
+            parts = [translated.strip()]
+        else:
+            parts = split_text(translated, len(chunk), separator)
+        if parts is None:
+            # Fallback to one request per text
+            log.warning('The translator merged the lines of the batch, translate them one by one')
+            parts = [translate(cleaned[i]) for i in chunk]
+        for i, part in zip(chunk, parts):
+            results[indices[i]] = part
+    return results
@@ -30,7 +30,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Union
+from typing import List, Optional, Union
 
 import lxml.etree
 import requests
@@ -39,21 +39,39 @@ import time
 import random
 import urllib
 import re
+import os
+import threading
+
+from image_translator.utils import batch
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+# Maximal length of a request
+MAX_LENGTH = 5000
+
+
+# Set IMAGE_TRANSLATOR_OFFLINE=1 to never query the server region
+OFFLINE = os.environ.get('IMAGE_TRANSLATOR_OFFLINE', '0') not in ('', '0')
 
 
 class TranslatorSeverRegion:
     @property
     def request_server_region_info(self):
         try:
-            ip_address = requests.get('http://httpbin.org/ip').json()['origin']
+            ip_address = requests.get('http://httpbin.org/ip', timeout=10).json()['origin']
             try:
                 data = requests.get(f'http://ip-api.com/json/{ip_address}', timeout=10).json()
                 return data
             except requests.exceptions.Timeout:
                 data = requests.post(
                     url='http://ip.taobao.com/outGetIpInfo',
-                    data={'ip': ip_address, 'accessKey': 'alibaba-inc'}
+                    data={'ip': ip_address, 'accessKey': 'alibaba-inc'},
+                    timeout=10
                 ).json().get('data')
+                if not data:
+                    return {}
                 data.update({'countryCode': data.get('country_id')})
                 return data
 
@@ -63,7 +81,29 @@ class TranslatorSeverRegion:
             raise Exception('Unable to find server backend.\n')
 
 
-REQUEST_SERVER_REGION_INFO = TranslatorSeverRegion().request_server_region_info
+_REGION_INFO: Optional[dict] = None
+_REGION_LOCK = threading.Lock()
+
+
+def get_server_region_info(offline: Optional[bool] = None) -> dict:
+    """
+    Return the region info of the server, it's only requested on the first call.
+    In offline mode or when the region can't be found an empty dict is returned.
+    """
+    global _REGION_INFO
+    if offline is None:
+        offline = OFFLINE
+    if offline:
+        return {}
+
+    with _REGION_LOCK:
+        if _REGION_INFO is None:
+            try:
+                _REGION_INFO = TranslatorSeverRegion().request_server_region_info or {}
+            except Exception as exc:
+                log.warning(f'Unable to find the server region, use the default host: {exc}')
+                _REGION_INFO = {}
+        return _REGION_INFO
 
 
 def get_headers(host_url, if_api=False, if_referer_for_host=True, if_ajax_for_api=True, if_json_for_api=False):
@@ -110,28 +150,73 @@ def check_query_text(query_text, if_ignore_limit_of_length=False):
     if not query_text:
         return ''
     length = len(query_text)
-    if length > 5000 and not if_ignore_limit_of_length:
+    if length > MAX_LENGTH and not if_ignore_limit_of_length:
         raise Exception('The length of the text to be translated exceeds the limit.')
     else:
         return query_text
 
 
+class RateLimiter():
+    """
+    Space the requests by at least min_interval seconds,
+    plus a random jitter of at most jitter seconds
+    """
+
+    def __init__(self, min_interval: float = 0.5, jitter: float = 0.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.last_call: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            if self.last_call is not None:
+                interval = self.min_interval + random.random() * self.jitter
+                remaining = self.last_call + interval - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+            self.last_call = time.monotonic()
+
+
 class Bing():
-    def __init__(self):
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None, token_ttl: float = 3500,
+                 proxies: Optional[dict] = None, region: Optional[str] = None,
+                 offline: Optional[bool] = None):
+        """
+        region: country code of the server (e.g. 'CN'), skip the region detection\n
+        offline: don't detect the region and use the default host, see OFFLINE\n
+        rate_limiter: limiter called before each request, default 0.5 second between requests\n
+        token_ttl: seconds before the token and the host info are fetched again\n
+        proxies: proxies of the session\n
+        """
         self.host_url = None
         self.cn_host_url = 'https://cn.bing.com/Translator'
         self.en_host_url = 'https://www.bing.com/Translator'
-        self.request_server_region_info = REQUEST_SERVER_REGION_INFO
+        self.region = region
+        self.offline = offline
         self.api_url = None
         self.host_headers = None
         self.api_headers = None
         self.host_info = None
         self.tk = None
         self.first_time = int(time.time())
+        self.token_ttl = token_ttl
         self.language_map = None
         self.query_count = 0
         self.output_auto = 'auto-detect'
         self.output_zh = 'zh-Hans'
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+
+        # The session keeps the connections and the cookies between the requests
+        self.session = requests.Session()
+        self.session.proxies.update(proxies or {})
+        self._lock = threading.Lock()
+
+    @property
+    def request_server_region_info(self) -> dict:
+        if self.region is not None:
+            return {'countryCode': self.region}
+        return get_server_region_info(self.offline)
 
     def get_host_info(self, host_html):
         et = lxml.etree.HTML(host_html)
@@ -139,7 +224,7 @@ class Bing():
         lang_list = list(set(lang_list))
         lang_list.remove(self.output_auto)
         language_map = {}.fromkeys(lang_list, lang_list)
-        iid = et.xpath('//*[@id="rich_tta"]/@data-iid')[0] + '.' + str(self.query_count + 1)
+        iid = et.xpath('//*[@id="rich_tta"]/@data-iid')[0]
         ig = re.compile('IG:"(.*?)"').findall(host_html)[0]
         return {'iid': iid, 'ig': ig, 'language_map': language_map}
 
@@ -148,6 +233,29 @@ class Bing():
         result = js2py.eval_js(result_str)
         return {'key': result[0], 'token': result[1]}
 
+    def expired(self) -> bool:
+        return not self.tk or time.time() - self.first_time > self.token_ttl
+
+    def refresh(self, use_cn_host: bool = False):
+        """
+        Fetch the host page to get the IG, the IID and the token
+        """
+        with self._lock:
+            self._refresh(use_cn_host)
+
+    def _refresh(self, use_cn_host: bool):
+        # Called with the lock held
+        self.host_url = self.cn_host_url if use_cn_host else self.en_host_url
+        self.host_headers = get_headers(self.host_url, if_api=False)
+        self.api_headers = get_headers(self.host_url, if_api=True)
+
+        host_html = self.session.get(self.host_url, headers=self.host_headers).text
+        self.host_info = self.get_host_info(host_html)
+        self.language_map = self.host_info.get('language_map')
+        self.tk = self.get_tk(host_html)
+        self.first_time = int(time.time())
+        self.query_count = 0
+
     def _bing_api(self, query_text: str, from_language: str = 'auto', to_language: str = 'en', **kwargs) -> Union[str, list]:
         """
         https://bing.com/Translator, https://cn.bing.com/Translator.
@@ -158,52 +266,81 @@ class Bing():
                 :param if_use_cn_host: boolean, default None.
                 :param if_ignore_limit_of_length: boolean, default False.
                 :param is_detail_result: boolean, default False.
-                :param proxies: dict, default None.
-                :param sleep_seconds: float, default `random.random()`.
         :return: str or list
         """
         use_cn_condition = kwargs.get('if_use_cn_host', None) or self.request_server_region_info.get('countryCode') == 'CN'
-        self.host_url = self.cn_host_url if use_cn_condition else self.en_host_url
-        self.api_url = self.host_url.replace('Translator', 'ttranslatev3')
-        self.host_headers = get_headers(self.host_url, if_api=False)
-        self.api_headers = get_headers(self.host_url, if_api=True)
+        host_url = self.cn_host_url if use_cn_condition else self.en_host_url
         is_detail_result = kwargs.get('is_detail_result', False)
-        proxies = kwargs.get('proxies', None)
-        sleep_seconds = kwargs.get('sleep_seconds', random.random())
         if_ignore_limit_of_length = kwargs.get('if_ignore_limit_of_length', False)
         query_text = check_query_text(query_text, if_ignore_limit_of_length)
         if not query_text:
             return ''
 
-        with requests.Session() as ss:
-            host_html = ss.get(self.host_url, headers=self.host_headers, proxies=proxies).text
-            self.host_info = self.get_host_info(host_html)
+        # The host page is only fetched again after the TTL or on failure,
+        # the threads sharing the client wait for a single refresh
+        with self._lock:
+            if self.expired() or host_url != self.host_url:
+                self._refresh(use_cn_condition)
+
+        try:
+            data = self._post(query_text, from_language, to_language)
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError, TypeError):
+            log.debug('Bing request failed, refresh the token')
+            self.refresh(use_cn_condition)
+            data = self._post(query_text, from_language, to_language)
+        return data if is_detail_result else data[0]['translations'][0]['text']
 
-            if not self.language_map:
-                self.language_map = self.host_info.get('language_map')
+    def _post(self, query_text: str, from_language: str, to_language: str) -> list:
+        self.rate_limiter.wait()
+        # The token and the counter are shared by the threads using the client,
+        # the requests themselves run concurrently
+        with self._lock:
             from_language, to_language = check_language(from_language, to_language, self.language_map,
                                                         output_zh=self.output_zh, output_auto=self.output_auto)
-            # params = {'isVertical': '1', '': '', 'IG': self.host_info['ig'], 'IID': self.host_info['iid']}
-            self.api_url = self.api_url + '?isVertical=1&&IG={}&IID={}'.format(self.host_info['ig'], self.host_info['iid'])
-
-            if not self.tk or time.time() - self.first_time > 3500:  # 3600
-                self.tk = self.get_tk(host_html)
+            self.query_count += 1
+            iid = self.host_info['iid'] + '.' + str(self.query_count)
+            api_url = self.host_url.replace('Translator', 'ttranslatev3')
+            api_url += '?isVertical=1&&IG={}&IID={}'.format(self.host_info['ig'], iid)
+            headers = dict(self.host_headers)
             form_data = {
                 'text': query_text,
                 'fromLang': from_language,
                 'to': to_language,
             }
             form_data.update(self.tk)
-            r = ss.post(self.api_url, headers=self.host_headers, data=form_data, proxies=proxies)
-            r.raise_for_status()
-            data = r.json()
-        time.sleep(sleep_seconds)
-        self.query_count += 1
-        return data if is_detail_result else data[0]['translations'][0]['text']
+        r = self.session.post(api_url, headers=headers, data=form_data)
+        r.raise_for_status()
+        data = r.json()
+        # An expired token returns an error dict instead of the translations
+        if not isinstance(data, list):
+            raise ValueError(f'Unexpected bing response: {data}')
+        return data
 
     def translate(self, query_text: str, from_language: str = 'auto', to_language: str = 'en'):
         return self._bing_api(query_text, from_language, to_language)
 
+    def translate_batch(self, query_texts: List[str], from_language: str = 'auto', to_language: str = 'en') -> List[str]:
+        """Translate the texts with as few requests as the length limit allows"""
+        return batch.translate_batch(query_texts,
+                                     lambda text: self.translate(text, from_language, to_language),
+                                     MAX_LENGTH)
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENT: Optional[Bing] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> Bing:
+    """Return the long-lived Bing client of the process"""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = Bing()
+        return _CLIENT
+
 
 if __name__ == '__main__':
     tra = Bing()
@@ -0,0 +1,136 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+import sqlite3
+import threading
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+# (backend, source language, destination language, normalized text)
+CacheKey = Tuple[str, str, str, str]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize the whitespaces of a text"""
+    return ' '.join(text.split())
+
+
+class TranslationCache():
+    """
+    Translation memory with an in-memory LRU tier
+    and an optional SQLite tier that survives restarts
+    """
+
+    def __init__(self, max_size: int = 10000, path: Optional[str] = None,
+                 timeout: float = 30.0):
+        """
+        max_size: number of translations kept in memory\n
+        path: SQLite database file, None to only keep the translations in memory\n
+        timeout: seconds to wait for the database when another process writes it\n
+        """
+        self.max_size: int = max_size
+        self.path: Optional[str] = path
+        self.hits: int = 0
+        self.misses: int = 0
+        self._memory: 'OrderedDict[CacheKey, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            # Several processes share the file, the readers don't block the writer
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS translations ('
+                             'backend TEXT, src TEXT, dest TEXT, text TEXT, translation TEXT, '
+                             'PRIMARY KEY (backend, src, dest, text))')
+            self._db.commit()
+
+    @staticmethod
+    def make_key(backend: str, src: str, dest: str, text: str) -> CacheKey:
+        return (backend, src, dest, normalize_text(text))
+
+    def get(self, backend: str, src: str, dest: str, text: str) -> Optional[str]:
+        """
+        Return the cached translation or None
+        """
+        key = TranslationCache.make_key(backend, src, dest, text)
+        with self._lock:
+            translation = self._memory.get(key)
+            if translation is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                try:
+                    row = self._db.execute('SELECT translation FROM translations WHERE '
+                                           'backend=? AND src=? AND dest=? AND text=?', key).fetchone()
+                except sqlite3.OperationalError as exc:
+                    log.warning(f'Unable to read the translation cache: {exc}')
+                    row = None
+                if row is not None:
+                    translation = row[0]
+                    self._store(key, translation)
+
+            if translation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return translation
+
+    def set(self, backend: str, src: str, dest: str, text: str, translation: str):
+        """
+        Add a translation in the cache
+        """
+        key = TranslationCache.make_key(backend, src, dest, text)
+        with self._lock:
+            self._store(key, translation)
+            if self._db is not None:
+                # The database is still locked after the timeout, the
+                # translation is only kept in memory
+                try:
+                    self._db.execute('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)',
+                                     key + (translation,))
+                    self._db.commit()
+                except sqlite3.OperationalError as exc:
+                    self._db.rollback()
+                    log.warning(f'Unable to write the translation cache: {exc}')
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counters"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._memory)}
+
+    def clear(self):
+        """Clear the memory tier and the counters"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _store(self, key: CacheKey, translation: str):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
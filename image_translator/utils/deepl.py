@@ -21,34 +21,36 @@
 # SOFTWARE
 # https://github.com/ffreemt/deepl-tr-async
 
-from typing import Any, Optional, Tuple, Union
+from typing import Dict, List, Optional, Set, Tuple
 
-import winreg
 import os
 import sys
 
 import asyncio
+import atexit
+import threading
 from timeit import default_timer
-from urllib.parse import quote
-
-from pyppeteer import launch
-import pyppeteer.chromium_downloader as chromium
-
 
 from shutil import which
+from image_translator.utils import batch
 # Logging
 import logging
 log = logging.getLogger('image_translator')
 
 
 URL = r"https://www.deepl.com/translator"
-LOOP = asyncio.get_event_loop()
+SOURCE_SELECTOR = ".lmt__source_textarea"
+TARGET_SELECTOR = 'textarea[dl-test="translator-target-input"]'
+# Maximal length of the source text
+MAX_LENGTH = 5000
+# Time without change of the output before the translation is done (seconds)
+STABLE_DELAY = 0.3
 
 HEADFUL = 1
 PROXY = ""
-LOOP = asyncio.get_event_loop()
 
-LOCAL_CHROMIUM = f'./chromium/{chromium.REVISION}/{chromium.windowsArchive}/chrome.exe'
+# Set to skip the search of chromium
+CHROMIUM_PATH: Optional[str] = None
 
 
 class NotFoundChrome(Exception):
@@ -65,13 +67,15 @@ def find_chromium_path() -> str:
         if which('chromium-browser') is not None:
             path = 'chromium-browser'
     elif sys.platform.startswith('win32'):
+        import winreg
         try:
             # Find with registry
             handle = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\App Paths\chrome.exe")
             path = winreg.EnumValue(handle, 0)[1]
         except FileNotFoundError:
             # Try local chromium
-            path = LOCAL_CHROMIUM
+            import pyppeteer.chromium_downloader as chromium
+            path = f'./chromium/{chromium.REVISION}/{chromium.windowsArchive}/chrome.exe'
             if not os.path.exists(path):
                 log.error('Not found chrome. Install chrome. Or use get components script')
                 raise NotFoundChrome('Not found chrome. Install chrome. Or use get components script')
@@ -82,18 +86,47 @@ def find_chromium_path() -> str:
 
     return path
 
-CHROMIUM_PATH = find_chromium_path()
+
+def get_chromium_path() -> str:
+    """Return the chromium path, it is searched on the first launch"""
+    global CHROMIUM_PATH
+    if CHROMIUM_PATH is None:
+        CHROMIUM_PATH = find_chromium_path()
+    return CHROMIUM_PATH
 
 
 class DeepL:
-    def __init__(self, src_lang: str, dest_lang: str):
+    """
+    DeepL translator through a headless browser. The browser and a pool
+    of pages are kept open between the translations, call close() to
+    shutdown the browser.
+    """
+
+    def __init__(self, src_lang: str, dest_lang: str, pool_size: int = 2,
+                 timeout: float = 30.0):
+        """
+        src_lang: source language\n
+        dest_lang: destination language\n
+        pool_size: number of pages translating at the same time\n
+        timeout: maximal time to wait a translation in seconds\n
+        """
         self.src_lang = src_lang
         self.dest_lang = dest_lang
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self.browser = None
+        self.pages: Optional[asyncio.Queue] = None
+        self._started: Optional[asyncio.Future] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
 
     async def get_ppbrowser(self):
         """ get a puppeeter browser.
         headless=not HEADFUL; proxy: str = PROXY
         """
+        from pyppeteer import launch
         try:
             browser = await launch(
                 args=[
@@ -106,142 +139,186 @@ class DeepL:
                     "--window-size=1440x900",
                     "--disable-popup-blocking",  #
                 ],
-                # autoClose=False,
                 headless=1,
                 dumpio=True,
-                executablePath=CHROMIUM_PATH
+                # The browser is closed by close()
+                handleSIGINT=False,
+                handleSIGTERM=False,
+                handleSIGHUP=False,
+                executablePath=get_chromium_path()
             )
         except Exception as exc:
             log.error("get_ppbrowser exc: %s", exc)
             raise
         return browser
 
-    async def deepl_tr_async(
-            self,
-            text: str,
-            from_lang: str = "auto",
-            to_lang: str = "auto",
-            waitfor: Optional[float] = None,
-    ) -> Optional[str]:
-        """ deepl via pyppeteer
-        from_lang = 'de'
-        to_lang = 'en'
-        debug = 1
-        """
-        then = default_timer()
-        count = 0
-        while count < 3:
-            count += 1
-            try:
-                page = await self.browser.newPage()
-                break
-            except Exception as exc:
-                log.error(f"browser.newPage exc: {exc}, failed attempt: {count}")
-                await asyncio.sleep(0)
-        else:
-            return
-
+    async def new_page(self):
+        """Open a page on the translator with the languages set"""
+        page = await self.browser.newPage()
         page.setDefaultNavigationTimeout(0)
-
-        url_ = f"{URL}#{self.src_lang}/{self.dest_lang}/{quote(text)}"
-        # # url_ = f'{URL}#{from_lang}/{to_lang}/'
-
-        count = 0
-        while count < 3:
-            count += 1
-            try:
-                await page.goto(url_, {"timeout": 90 * 1000})
-                break
-            except Exception as exc:
-                await asyncio.sleep(0)
-                page = await self.browser.newPage()
-                log.warning(f"page.goto exc: {str(exc)}, attempt {count}")
-        else:
-            # return
-            raise Exception(f"Unable to fetch {url_[:20]}...")
-
-        # wait for input area ".lmt__source_textarea"
+        await page.goto(f"{URL}#{self.src_lang}/{self.dest_lang}/", {"timeout": 90 * 1000})
+        await page.waitForSelector(SOURCE_SELECTOR, {"timeout": self.timeout * 1000})
+        return page
+
+    async def start_async(self):
+        """Launch the browser once, the concurrent calls wait the same launch"""
+        if self._started is None:
+            self._started = asyncio.ensure_future(self.launch_async())
         try:
-            # await page.waitFor(".lmt__message_box2__content")
-            await page.waitForSelector(".lmt__source_textarea",
-                                       {"timeout": 1000})  # ms
-            log.debug("Succes getting source textarea")
-        # except TimeoutError:
+            await self._started
         except Exception:
-            await asyncio.sleep(0.5)
-            # raise
+            # Launch again on the next call
+            self._started = None
+            raise
 
-        log.debug(f"page.goto(url_) time: {default_timer() - then } s")
+    async def launch_async(self):
+        """Launch the browser and fill the pool of pages"""
         then = default_timer()
-
-        # .lmt__message_box2__content
-
-        await page.waitFor(2500)  # ms
-
-        # wait for popup to be visible
-
-        if waitfor is None:
-            _ = max(100, len(text) * 3.6)
-            log.debug(f"waiting for {_} ms")
-        else:
+        self.browser = await self.get_ppbrowser()
+        self.pages = asyncio.Queue()
+        for page in await asyncio.gather(*[self.new_page() for _ in range(self.pool_size)]):
+            self.pages.put_nowait(page)
+        log.debug(f"DeepL browser started in {default_timer() - then:.2f} s")
+
+    async def set_source(self, page, text: str):
+        await page.evaluate(
+            """(selector, text) => {
+                const elm = document.querySelector(selector);
+                elm.value = text;
+                elm.dispatchEvent(new Event('input', {bubbles: true}));
+            }""", SOURCE_SELECTOR, text)
+
+    async def get_target(self, page) -> str:
+        return await page.evaluate(
+            "selector => document.querySelector(selector).value", TARGET_SELECTOR)
+
+    async def deepl_tr_async(self, text: str) -> str:
+        """Translate the text with a page of the pool"""
+        await self.start_async()
+        pages = self.pages
+        page = await pages.get()
+        try:
+            if page.isClosed():
+                page = await self.new_page()
+            then = default_timer()
+            timeout = self.timeout * 1000
+
+            # Clear the previous translation so an identical
+            # translation is also detected as a change
+            await self.set_source(page, '')
+            await page.waitForFunction(
+                f"() => document.querySelector('{TARGET_SELECTOR}').value.trim() === ''",
+                {"timeout": timeout, "polling": 50})
+
+            await self.set_source(page, text)
+            await page.waitForFunction(
+                f"() => document.querySelector('{TARGET_SELECTOR}').value.trim() !== ''",
+                {"timeout": timeout, "polling": 50})
+
+            # The translation can be updated in several steps,
+            # wait until it doesn't change anymore or the timeout
+            res = await self.get_target(page)
+            deadline = default_timer() + self.timeout
+            while default_timer() < deadline:
+                await asyncio.sleep(STABLE_DELAY)
+                current = await self.get_target(page)
+                if current == res:
+                    break
+                res = current
+            else:
+                log.warning(f"DeepL translation still changing after {self.timeout} s, use the last one")
+
+            log.debug(f"DeepL translation time: {default_timer() - then:.2f} s")
+        except Exception:
+            # The page is in an unknown state, it's replaced on the next call
             try:
-                _ = float(waitfor)
+                await page.close()
             except Exception as exc:
-                log.warning(
-                    f"invalif waitfor [{waitfor}]: {exc},"
-                    f"setting to auto-adjust"
-                )
-                _ = max(100, len(text) * 3.6)
+                log.warning(f"page.close exc: {exc}")
+            raise
+        finally:
+            # The pool is dropped when the client is closed during the translation
+            if self.pages is pages:
+                pages.put_nowait(page)
+
+        return res.rstrip('\n')
 
-            log.debug("preset fixed waiting for %.1f ms", _)
+    def _run(self, coro):
+        """Run a coroutine on the loop of the browser"""
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+                self._thread.start()
+                _ENGINES.add(self)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def translate(self, text: str) -> str:
+        """Translate a text, several threads can translate at the same time"""
         try:
-            await page.waitFor(_)
+            return self._run(self.deepl_tr_async(text))
         except Exception as exc:
-            log.warning(" page.waitFor exc: %s", exc)
+            log.error(f"DeepL translation exc: {exc}")
+            raise
 
-        log.debug("time: %.2f s", default_timer() - then)
+    def translate_batch(self, texts: List[str]) -> List[str]:
+        """Translate the texts with as few pages as the length limit allows"""
+        return batch.translate_batch(texts, self.translate, MAX_LENGTH)
+
+    async def close_async(self):
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+            self.pages = None
+        self._started = None
+
+    def close(self):
+        """Close the browser and stop the loop"""
+        with self._lock:
+            loop = self.loop
+            self.loop = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.close_async(), loop).result(self.timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(self.timeout)
+            loop.close()
+            _ENGINES.discard(self)
 
-        output_area = await page.J(
-            'textarea[dl-test="translator-target-input"]')
-        res = await page.evaluate('elm => elm.value', output_area)
+    def __enter__(self):
+        return self
 
-        await page.close()
+    def __exit__(self, *args):
+        self.close()
 
-        await asyncio.sleep(0.2)
 
-        return res.rstrip('\n')
+# Running engines, closed at exit
+_ENGINES: Set[DeepL] = set()
+_CLIENTS: Dict[Tuple[str, str], DeepL] = {}
+_CLIENTS_LOCK = threading.Lock()
 
-    def translate(
-            self,
-            text: str,
-            # headless: bool = not HEADFUL,
-            waitfor: Optional[float] = None,
-            loop=None
-    ) -> Union[Tuple[Optional[str]], Any]:
-        # ) -> List[Union[Optional[str], Any]]:
-        """ multiple pages
-        """
 
-        if loop is None:
-            loop = LOOP
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
+def get_client(src_lang: str, dest_lang: str) -> DeepL:
+    """Return the long-lived DeepL engine of the languages"""
+    with _CLIENTS_LOCK:
+        if (src_lang, dest_lang) not in _CLIENTS:
+            _CLIENTS[(src_lang, dest_lang)] = DeepL(src_lang, dest_lang)
+        return _CLIENTS[(src_lang, dest_lang)]
 
-        self.browser = LOOP.run_until_complete(self.get_ppbrowser())
+
+@atexit.register
+def close_all():
+    """Close all the browsers"""
+    for engine in list(_ENGINES):
         try:
-            res = loop.run_until_complete(
-                self.deepl_tr_async(
-                                    text,
-                                    from_lang=self.src_lang,
-                                    to_lang=self.dest_lang,
-                                    waitfor=waitfor))
+            engine.close()
         except Exception as exc:
-            log.error(f"loop.run_until_complete exc: {exc}")
-            res = str(exc)
-
-        return res
+            log.warning(f"Unable to close DeepL browser: {exc}")
+    _CLIENTS.clear()
 
 
 if __name__ == '__main__':
-    tra = DeepL('en', 'fr')
-    print(tra.translate('This a test'))
+    with DeepL('en', 'fr') as tra:
+        print(tra.translate('This a test'))
@@ -0,0 +1,193 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+def detection_factor(shape: Tuple[int, ...], max_side: Optional[int] = None,
+                     scale: float = 1.0) -> float:
+    """
+    Return the factor applied to the image before the detection,
+    the image is never upscaled
+    """
+    factor = scale
+    longest = max(shape[0], shape[1])
+    if max_side is not None and longest * factor > max_side:
+        factor = max_side / longest
+    return min(factor, 1.0)
+
+
+def scale_boxes(horizontal_list: List, free_list: List, factor: float) -> Tuple[List, List]:
+    """
+    Scale the boxes of the detection by factor
+    horizontal box: [x_min, x_max, y_min, y_max]
+    free box: [[x1, y1], [x2, y2], [x3, y3], [x4, y4]]
+    """
+    horizontal = [[int(round(value * factor)) for value in box] for box in horizontal_list]
+    free = [[[int(round(x * factor)), int(round(y * factor))] for x, y in box] for box in free_list]
+    return horizontal, free
+
+
+def free_box_rect(box: List) -> List[int]:
+    """Bounding box [x_min, x_max, y_min, y_max] of a free box"""
+    xs = [int(x) for x, _ in box]
+    ys = [int(y) for _, y in box]
+    return [min(xs), max(xs), min(ys), max(ys)]
+
+
+def detect_boxes(reader: Any, img: np.ndarray, max_side: Optional[int] = None,
+                 scale: float = 1.0) -> Tuple[List, List]:
+    """
+    Run the CRAFT text detection on a downscaled copy of the image and
+    return the boxes in the coordinates of the source image.\n
+    max_side: maximal size of the longest side of the detection image\n
+    scale: factor applied to the image before the detection\n
+    """
+    factor = detection_factor(img.shape, max_side, scale)
+    if factor >= 1.0:
+        horizontal_list, free_list = reader.detect(img)[:2]
+        return horizontal_list, free_list
+
+    height, width = img.shape[:2]
+    size = (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+    log.debug(f'Run text detection at {size[0]}x{size[1]}')
+    small = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    horizontal_list, free_list = reader.detect(small)[:2]
+    return scale_boxes(horizontal_list, free_list, 1 / factor)
+
+
+def check_tile_overlap(tile_height: int, overlap: int):
+    """Raise ValueError when the overlap isn't smaller than the tile"""
+    if overlap < 0 or overlap >= tile_height:
+        raise ValueError(f'The tile overlap must be in [0, {tile_height}), got {overlap}')
+
+
+def tile_bands(height: int, tile_height: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Split the height into overlapping bands. Return for each band
+    (start, end, own_start, own_end), a box belongs to the band
+    whose own range contains its vertical center.
+    Raise ValueError when the overlap isn't smaller than the tile.
+    """
+    check_tile_overlap(tile_height, overlap)
+    step = tile_height - overlap
+    bands = []
+    start = 0
+    while True:
+        end = min(start + tile_height, height)
+        last = end >= height
+        own_start = 0 if start == 0 else start + overlap // 2
+        own_end = height if last else end - overlap // 2
+        bands.append((start, end, own_start, own_end))
+        if last:
+            return bands
+        start += step
+
+
+def merge_boxes(boxes: List) -> List:
+    """
+    Merge the horizontal boxes found twice on a seam,
+    boxes covering more than half of each other become their union
+    """
+    merged: List = []
+    for box in sorted(boxes, key=lambda box: box[2]):
+        for other in merged:
+            width = min(box[1], other[1]) - max(box[0], other[0])
+            height = min(box[3], other[3]) - max(box[2], other[2])
+            if width <= 0 or height <= 0:
+                continue
+            smallest = min((box[1] - box[0]) * (box[3] - box[2]),
+                           (other[1] - other[0]) * (other[3] - other[2]))
+            if width * height * 2 >= smallest:
+                other[:] = [min(box[0], other[0]), max(box[1], other[1]),
+                            min(box[2], other[2]), max(box[3], other[3])]
+                break
+        else:
+            merged.append(list(box))
+    return merged
+
+
+def detect_boxes_tiled(reader: Any, img: np.ndarray, tile_height: int, overlap: int = 200,
+                       max_side: Optional[int] = None, scale: float = 1.0) -> Tuple[List, List]:
+    """
+    Run the text detection on overlapping horizontal tiles, the memory
+    of the detection is bounded by the tile size. The overlap must be
+    larger than the text lines so each line is fully in one tile.
+    """
+    horizontal_list: List = []
+    free_list: List = []
+    for start, end, own_start, own_end in tile_bands(img.shape[0], tile_height, overlap):
+        log.debug(f'Run text detection on tile {start}-{end}')
+        horizontal, free = detect_boxes(reader, img[start:end], max_side, scale)
+        for box in horizontal:
+            box = [box[0], box[1], box[2] + start, box[3] + start]
+            if own_start <= (box[2] + box[3]) / 2 < own_end:
+                horizontal_list.append(box)
+        for box in free:
+            box = [[x, y + start] for x, y in box]
+            if own_start <= sum(y for _, y in box) / 4 < own_end:
+                free_list.append(box)
+    return merge_boxes(horizontal_list), free_list
+
+
+def group_boxes(boxes: List, shape: Tuple[int, ...], distance: int = 9) -> List[Tuple[List[int], List]]:
+    """
+    Group the horizontal boxes into paragraphs without a mask of the
+    image size. Two boxes are in the same paragraph when their gap is
+    small enough to be joined by a dilation of distance iterations.
+    Return the bounding rect [x, y, w, h] and the boxes of each paragraph.
+    """
+    height, width = shape[:2]
+    boxes = sorted(boxes, key=lambda box: box[2])
+    parent = list(range(len(boxes)))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    # The boxes are sorted by top, only the boxes above within
+    # the distance can be joined
+    active: List[int] = []
+    for index, box in enumerate(boxes):
+        active = [other for other in active if boxes[other][3] + 2 * distance + 2 >= box[2]]
+        for other in active:
+            gap_x = max(0, box[0] - boxes[other][1], boxes[other][0] - box[1])
+            gap_y = max(0, box[2] - boxes[other][3], boxes[other][2] - box[3])
+            # The dilated boxes touch by a side or by a corner
+            if gap_x + gap_y <= 2 * distance + (2 if gap_x and gap_y else 1):
+                parent[find(index)] = find(other)
+        active.append(index)
+
+    groups: dict = {}
+    for index, box in enumerate(boxes):
+        groups.setdefault(find(index), []).append(box)
+
+    paragraphs = []
+    for members in groups.values():
+        x1 = max(0, int(min(box[0] for box in members)) - distance)
+        x2 = min(width - 1, int(max(box[1] for box in members)) + distance)
+        y1 = max(0, int(min(box[2] for box in members)) - distance)
+        y2 = min(height - 1, int(max(box[3] for box in members)) + distance)
+        paragraphs.append(([x1, y1, x2 - x1 + 1, y2 - y1 + 1], members))
+    return sorted(paragraphs, key=lambda item: (item[0][1], item[0][0]))
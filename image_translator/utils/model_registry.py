@@ -0,0 +1,150 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Any, Callable, Iterable, Optional, Tuple
+from collections import OrderedDict
+import threading
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+MODEL_STORAGE_DIRECTORY = 'easyocr/model'
+
+# (language set, gpu, model directory)
+ReaderKey = Tuple[Tuple[str, ...], bool, str]
+
+
+def load_easyocr_reader(lang_list: Tuple[str, ...], gpu: bool, model_dir: str) -> Any:
+    """Build an easyocr reader, this loads the CRAFT detector and the recognizer"""
+    import easyocr
+    return easyocr.Reader(list(lang_list), gpu=gpu,
+                          model_storage_directory=model_dir)
+
+
+def estimate_reader_memory(reader: Any) -> int:
+    """
+    Return the number of bytes taken by the weights of a reader
+    """
+    size = 0
+    for name in ('detector', 'recognizer'):
+        model = getattr(reader, name, None)
+        if model is None or not hasattr(model, 'parameters'):
+            continue
+        for tensor in list(model.parameters()) + list(model.buffers()):
+            size += tensor.numel() * tensor.element_size()
+    return size
+
+
+class ReaderRegistry():
+    """
+    Process-wide registry of easyocr readers.
+    Each reader is loaded once per (language set, gpu, model directory)
+    and the least recently used readers are evicted when the memory
+    taken by the loaded readers exceeds max_memory (in bytes).
+    """
+
+    def __init__(self, max_memory: Optional[int] = None,
+                 loader: Callable[[Tuple[str, ...], bool, str], Any] = load_easyocr_reader,
+                 sizer: Callable[[Any], int] = estimate_reader_memory):
+        self.max_memory: Optional[int] = max_memory
+        self.loader = loader
+        self.sizer = sizer
+        self._readers: 'OrderedDict[ReaderKey, Tuple[Any, int]]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def make_key(lang_list: Iterable[str], gpu: bool = False,
+                 model_dir: str = MODEL_STORAGE_DIRECTORY) -> ReaderKey:
+        return (tuple(sorted(set(lang_list))), bool(gpu), model_dir)
+
+    def get(self, lang_list: Iterable[str], gpu: bool = False,
+            model_dir: str = MODEL_STORAGE_DIRECTORY) -> Any:
+        """
+        Return the reader for the key, load it if needed
+        """
+        key = ReaderRegistry.make_key(lang_list, gpu, model_dir)
+        with self._lock:
+            if key in self._readers:
+                self._readers.move_to_end(key)
+                return self._readers[key][0]
+
+            log.debug(f'Load easyocr reader {key}')
+            reader = self.loader(*key)
+            self._readers[key] = (reader, self.sizer(reader))
+            self._evict(keep=key)
+            return reader
+
+    def warmup(self, lang_sets: Iterable[Iterable[str]], gpu: bool = False,
+               model_dir: str = MODEL_STORAGE_DIRECTORY):
+        """
+        Load the readers of each language set, meant to be called at startup
+        """
+        for lang_list in lang_sets:
+            self.get(lang_list, gpu, model_dir)
+
+    def memory(self) -> int:
+        """Return the estimated memory taken by the loaded readers"""
+        with self._lock:
+            return sum(size for _, size in self._readers.values())
+
+    def set_max_memory(self, max_memory: Optional[int]):
+        with self._lock:
+            self.max_memory = max_memory
+            self._evict()
+
+    def evict(self, lang_list: Iterable[str], gpu: bool = False,
+              model_dir: str = MODEL_STORAGE_DIRECTORY):
+        """Remove one reader from the registry"""
+        with self._lock:
+            self._readers.pop(ReaderRegistry.make_key(lang_list, gpu, model_dir), None)
+
+    def clear(self):
+        with self._lock:
+            self._readers.clear()
+
+    def __contains__(self, key: ReaderKey) -> bool:
+        return key in self._readers
+
+    def __len__(self) -> int:
+        return len(self._readers)
+
+    def _evict(self, keep: Optional[ReaderKey] = None):
+        if self.max_memory is None:
+            return
+        # Oldest readers first, the reader just loaded is never evicted
+        for key in list(self._readers):
+            if self.memory() <= self.max_memory:
+                break
+            if key == keep:
+                continue
+            log.debug(f'Evict easyocr reader {key}')
+            del self._readers[key]
+
+
+READERS = ReaderRegistry()
+
+
+def get_reader(lang_list: Iterable[str], gpu: bool = False,
+               model_dir: str = MODEL_STORAGE_DIRECTORY) -> Any:
+    """Return a shared easyocr reader"""
+    return READERS.get(lang_list, gpu, model_dir)
+
+
+def warmup(lang_sets: Iterable[Iterable[str]], gpu: bool = False,
+           model_dir: str = MODEL_STORAGE_DIRECTORY):
+    """Load the easyocr readers in the process-wide registry"""
+    READERS.warmup(lang_sets, gpu, model_dir)
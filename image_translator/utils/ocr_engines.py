@@ -0,0 +1,286 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+
+import numpy as np
+
+from image_translator.types import Paragraph, Word
+from image_translator.utils import lang
+from image_translator.utils import model_registry
+from image_translator.utils import tesseract
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+class UnknownOCR(Exception):
+    pass
+
+
+class OCREngine():
+    """
+    Base class of the OCR engines, an engine reads one language. The words
+    are returned in the coordinates of the crop, padded by 6 pixels, with
+    their confidence between 0 and 100.
+    """
+
+    # Name of the engine in the registry
+    name: str = ''
+    # Column of the engine codes in utils.lang.OCR_LANG
+    lang_index: int = 0
+    # Words with a lower confidence are dropped
+    min_confidence: float = 0
+
+    def __init__(self, lang_code: str, gpu: bool = False):
+        """
+        lang_code: language code of the engine\n
+        gpu: run the engine on the gpu when it can\n
+        """
+        self.lang_code = lang_code
+        self.gpu = gpu
+
+    @classmethod
+    def lang_code_of(cls, code: str) -> str:
+        """
+        Return the code of a language for this engine, 'invalid' if the
+        engine doesn't have the language. Raise KeyError for an unknown code.
+        """
+        return lang.OCR_LANG[code][cls.lang_index]
+
+    def warmup(self):
+        """Load the models of the engine"""
+
+    def recognize(self, crop: np.ndarray) -> List[Word]:
+        raise NotImplementedError
+
+    def recognize_batch(self, crops: List[np.ndarray], boxes: Optional[List[List]] = None,
+                        free_boxes: Optional[List[List]] = None) -> List[List[Word]]:
+        """
+        Read several crops, the engines batch them in their own way.\n
+        boxes: text boxes [x_min, x_max, y_min, y_max] of each crop found by the detection\n
+        free_boxes: rotated text boxes [[x1, y1], ..., [x4, y4]] of each crop found by the detection\n
+        """
+        return [self.recognize(crop) for crop in crops]
+
+
+def split_words(words: List[Word], positions: List[Tuple[int, int]],
+                heights: List[int]) -> List[List[Word]]:
+    """
+    Split the words read on a sheet by crop, a word belongs to the crop
+    containing its vertical center. The words are moved to the coordinates
+    of their crop.
+    """
+    parts: List[List[Word]] = [[] for _ in positions]
+    for word in words:
+        center = (word.y1 + word.y2) / 2
+        for index, ((x, y), height) in enumerate(zip(positions, heights)):
+            if y <= center < y + height:
+                parts[index].append(offset_word(word, -x, -y))
+                break
+    return parts
+
+
+def offset_word(word: Word, x: int, y: int) -> Word:
+    """Return the word moved by x and y"""
+    return Word(word.text, word.x1 + x, word.y1 + y, word.x2 + x, word.y2 + y,
+                word.w, word.h, word.get('line'), word.get('conf'))
+
+
+class TesseractOCR(OCREngine):
+    """
+    Tesseract, a batch of crops is read in one pass on a sheet
+    """
+    name = 'tesseract'
+    lang_index = 0
+    min_confidence = tesseract.MIN_CONFIDENCE
+
+    def warmup(self):
+        tesseract.get_engine(self.lang_code).warmup()
+
+    def recognize(self, crop: np.ndarray) -> List[Word]:
+        data = tesseract.get_engine(self.lang_code).image_to_data(crop)
+        return tesseract.convert_tesserract_output(data, 0, 0)
+
+    def recognize_batch(self, crops: List[np.ndarray], boxes: Optional[List[List]] = None,
+                        free_boxes: Optional[List[List]] = None) -> List[List[Word]]:
+        if not crops:
+            return []
+        sheet, positions = tesseract.compose_sheet(crops)
+        data = tesseract.get_engine(self.lang_code).image_to_data(sheet)
+        parts = tesseract.split_data(data, positions, [crop.shape[0] for crop in crops])
+        return [tesseract.convert_tesserract_output(part, -x, -y)
+                for part, (x, y) in zip(parts, positions)]
+
+
+def sort_reading_order(result: List) -> List:
+    """
+    Sort EasyOCR results by line from top to bottom
+    and from left to right in a line
+    """
+    items = sorted(result, key=lambda item: item[0][0][1])
+    lines: List[List] = []
+    for item in items:
+        top = item[0][0][1]
+        # Same line when the top is above the middle of the first box of the line
+        if lines and top < (lines[-1][0][0][0][1] + lines[-1][0][0][2][1]) / 2:
+            lines[-1].append(item)
+        else:
+            lines.append([item])
+    return [item for line in lines for item in sorted(line, key=lambda item: item[0][0][0])]
+
+
+def convert_easyocr_output(result: List) -> List[Word]:
+    """
+    Convert the output of EasyOCR to words
+    """
+    # 1|----------------------------|2
+    #  |                            |
+    # 4|----------------------------|3
+    # [[[x1,y1],[x2,y2][x3,y3],[x4,y4],text],confidence]
+    words: List[Word] = []
+    for item in result:
+        point1 = item[0][0]
+        point2 = item[0][2]
+        words.append(Word(item[1], int(point1[0]) - 6, int(point1[1]) - 6,
+                          int(point2[0]) + 6, int(point2[1]) + 6,
+                          int(point2[0] - point1[0]) + 6, int(point2[1] - point1[1]) + 6,
+                          conf=float(item[2]) * 100 if len(item) > 2 else None))
+    return words
+
+
+class EasyOCR(OCREngine):
+    """
+    EasyOCR, a batch of crops is stacked on a sheet and the boxes of the
+    detection are recognized in batches of batch_size
+    """
+    name = 'easyocr'
+    lang_index = 1
+    # Number of boxes recognized at once
+    batch_size = 16
+
+    def reader(self):
+        return model_registry.get_reader([self.lang_code], gpu=self.gpu)
+
+    def warmup(self):
+        self.reader()
+
+    def recognize(self, crop: np.ndarray) -> List[Word]:
+        return convert_easyocr_output(self.reader().readtext(crop))
+
+    def recognize_batch(self, crops: List[np.ndarray], boxes: Optional[List[List]] = None,
+                        free_boxes: Optional[List[List]] = None) -> List[List[Word]]:
+        if not crops:
+            return []
+        sheet, positions = tesseract.compose_sheet(crops)
+        if boxes is None:
+            result = self.reader().readtext(sheet, batch_size=self.batch_size)
+        else:
+            # The boxes of the detection are moved on the sheet
+            horizontal_list = [[box[0] + x, box[1] + x, box[2] + y, box[3] + y]
+                               for crop_boxes, (x, y) in zip(boxes, positions) for box in crop_boxes]
+            free_list = [[[point_x + x, point_y + y] for point_x, point_y in box]
+                         for crop_boxes, (x, y) in zip(free_boxes or [], positions) for box in crop_boxes]
+            result = self.reader().recognize(sheet, horizontal_list=horizontal_list, free_list=free_list,
+                                             batch_size=self.batch_size)
+        words = convert_easyocr_output(sort_reading_order(result))
+        return split_words(words, positions, [crop.shape[0] for crop in crops])
+
+
+def join_words(words: List[Word]) -> str:
+    """
+    Join the words of a paragraph into its text, a word hyphenated at the
+    end of a line is joined with the first word of the next line
+    """
+    text = ''
+    for index, word in enumerate(words):
+        following = words[index + 1] if index + 1 < len(words) else None
+        if following is not None and len(word['text']) > 1 and word['text'].endswith('-') and \
+           following.get('line') is not None and following.get('line') != word.get('line'):
+            text += word['text'][:-1]
+        else:
+            text += word['text']
+            text += ' '
+    return text
+
+
+def fill_paragraph(paragraph: Paragraph, words: List[Word], min_confidence: float = 0) -> Paragraph:
+    """
+    Fill the paragraph with the words read on its crop, the words
+    are moved to the image coordinates
+    """
+    words = [offset_word(word, paragraph['dx'], paragraph['dy']) for word in words
+             if word.get('conf') is None or word['conf'] >= min_confidence]
+    paragraph['word_list'] = words
+    paragraph['max_width'] = paragraph['w']
+    if not words:
+        paragraph['x'] = paragraph['dx']
+        paragraph['y'] = paragraph['dy']
+        paragraph['font_size'] = 0
+        paragraph['text'] = ''
+        return paragraph
+
+    paragraph['x'] = words[0]['x1'] - 40
+    paragraph['y'] = words[0]['y1'] - 15
+    # Only for Cantarell -> Find a solution for all fonts
+    paragraph['font_size'] = int(words[0]['h']*1.1)
+    paragraph['text'] = join_words(words)
+    return paragraph
+
+
+_ENGINE_CLASSES: Dict[str, Callable[..., OCREngine]] = {}
+_ENGINES: Dict[Tuple[str, str, bool], OCREngine] = {}
+_LOCK = threading.Lock()
+
+
+def register(name: str, engine_class: Callable[..., OCREngine]):
+    """
+    Register an OCR engine, the class is called with the language code
+    and the gpu flag on the first use of each language
+    """
+    with _LOCK:
+        _ENGINE_CLASSES[name] = engine_class
+        for key in [key for key in _ENGINES if key[0] == name]:
+            del _ENGINES[key]
+
+
+def engine_class(name: str) -> Callable[..., OCREngine]:
+    """Return the registered class of an engine"""
+    with _LOCK:
+        if name not in _ENGINE_CLASSES:
+            raise UnknownOCR(f'OCR {name} is not available')
+        return _ENGINE_CLASSES[name]
+
+
+def get(name: str, lang_code: str, gpu: bool = False) -> OCREngine:
+    """Return the shared engine of a language"""
+    cls = engine_class(name)
+    with _LOCK:
+        key = (name, lang_code, gpu)
+        if key not in _ENGINES:
+            _ENGINES[key] = cls(lang_code, gpu)
+        return _ENGINES[key]
+
+
+def available() -> List[str]:
+    """Names of the registered engines"""
+    with _LOCK:
+        return list(_ENGINE_CLASSES)
+
+
+register('tesseract', TesseractOCR)
+register('easyocr', EasyOCR)
@@ -0,0 +1,83 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Dict, Iterator, List
+from contextlib import contextmanager
+from functools import wraps
+from timeit import default_timer
+import threading
+
+# Stages of the pipeline
+STAGES = ('detect', 'paragraph', 'binarize', 'ocr', 'translate', 'inpaint', 'render')
+# Counters of the pipeline
+COUNTERS = ('paragraphs', 'words', 'characters', 'cache_hits', 'cache_misses')
+
+
+class Profile():
+    """
+    Time spent in each stage and counters of one image. A stage
+    nested in another is only counted in the inner stage. The stages
+    running in several threads add up their times.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self.counts: Dict[str, int] = {counter: 0 for counter in COUNTERS}
+        self._lock = threading.Lock()
+        # Stack of the running stages of each thread: [name, start, time of the inner stages]
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the time of the block in the stage"""
+        stack: List[list] = self._local.__dict__.setdefault('stack', [])
+        frame = [name, default_timer(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = default_timer() - frame[1]
+            if stack:
+                stack[-1][2] += elapsed
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - frame[2]
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """
+        Return the profile as a dict:
+        {'seconds': {stage: time}, 'counts': {counter: value}, 'total': time of all the stages}
+        """
+        with self._lock:
+            return {'seconds': dict(self.seconds), 'counts': dict(self.counts),
+                    'total': sum(self.seconds.values())}
+
+
+def timed(stage: str):
+    """
+    Decorator measuring a method in a stage of the
+    profile attribute of its object
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profile.stage(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
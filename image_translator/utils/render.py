@@ -0,0 +1,118 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Iterable, List, Tuple
+from functools import lru_cache, partial
+
+import numpy as np
+
+import PIL.Image as PIL_Img
+import PIL.ImageFont as PIL_ImgFont
+import PIL.ImageDraw as PIL_ImgDraw
+
+from image_translator.types import Paragraph
+from image_translator.utils.text_wrap import fit_font_size, get_wrapper
+
+
+FONT_PATH = 'font/Cantarell.ttf'
+
+
+@lru_cache(maxsize=128)
+def get_font(path: str, size: int) -> PIL_ImgFont.FreeTypeFont:
+    """
+    Return the font of the size, the fonts are loaded once from the disk
+    """
+    return PIL_ImgFont.truetype(path, size=size, encoding="unic")
+
+
+class Renderer():
+    """
+    Draw the translated paragraphs, all the paragraphs
+    of a page are drawn on one PIL surface
+    """
+
+    def __init__(self, font_path: str = FONT_PATH, fit_text: bool = False):
+        """
+        font_path: font of the translations\n
+        fit_text: use the largest font size whose text fits in the paragraph box\n
+        """
+        self.font_path = font_path
+        self.fit_text = fit_text
+
+    def font_size(self, paragraph: Paragraph) -> int:
+        """
+        Return the font size of the paragraph
+        """
+        if not self.fit_text:
+            return paragraph['font_size']
+        return fit_font_size(paragraph['translated_text'],
+                             partial(get_font, self.font_path),
+                             paragraph['max_width'], paragraph['h'])
+
+    def layout(self, paragraph: Paragraph) -> Tuple[PIL_ImgFont.FreeTypeFont, List[str], int]:
+        """
+        Return the font, the wrapped lines and the line height of the paragraph
+        """
+        font = get_font(self.font_path, self.font_size(paragraph))
+        wrapper = get_wrapper(font)
+        return font, wrapper.wrap(paragraph['translated_text'], paragraph['max_width']), wrapper.line_height
+
+    def draw_paragraph(self, draw: PIL_ImgDraw.ImageDraw, paragraph: Paragraph, offset: int = 0):
+        """
+        Draw the translation of one paragraph\n
+        offset: vertical position of the surface in the image\n
+        """
+        font, lines, height = self.layout(paragraph)
+        y = paragraph['y'] - offset
+        for line in lines:
+            draw.text((paragraph['x'], y), line, fill=paragraph['text_color'][::-1], font=font)
+            y = y + height
+
+    def render(self, img: np.ndarray, paragraphs: Iterable[Paragraph]) -> np.ndarray:
+        """
+        Draw the paragraphs on the image, the image is converted
+        to PIL and back only once
+        """
+        im_pil = PIL_Img.fromarray(img)
+        draw = PIL_ImgDraw.Draw(im_pil)
+        for paragraph in paragraphs:
+            if paragraph['text'] != '':
+                self.draw_paragraph(draw, paragraph)
+        return np.asarray(im_pil)
+
+    def render_tiled(self, img: np.ndarray, paragraphs: Iterable[Paragraph],
+                     tile_height: int) -> np.ndarray:
+        """
+        Draw the paragraphs on the image in place, one horizontal tile at
+        a time so only a tile is converted to PIL. A paragraph crossing a
+        seam is drawn on each tile it covers.
+        """
+        extents = []
+        for paragraph in paragraphs:
+            if paragraph['text'] != '':
+                lines, height = self.layout(paragraph)[1:]
+                extents.append((paragraph['y'], paragraph['y'] + len(lines) * height, paragraph))
+
+        for start in range(0, img.shape[0], tile_height):
+            end = min(start + tile_height, img.shape[0])
+            tile = [paragraph for top, bottom, paragraph in extents if top < end and bottom > start]
+            if not tile:
+                continue
+            im_pil = PIL_Img.fromarray(img[start:end])
+            draw = PIL_ImgDraw.Draw(im_pil)
+            for paragraph in tile:
+                self.draw_paragraph(draw, paragraph, start)
+            img[start:end] = np.asarray(im_pil)
+        return img
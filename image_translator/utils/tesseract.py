@@ -0,0 +1,212 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from contextlib import contextmanager
+import importlib.util
+import threading
+import sys
+
+import numpy as np
+import PIL.Image as PIL_Img
+
+from image_translator.types import Word
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+TESSDATA_PATH: Optional[str] = 'tesseract-ocr/tessdata' if sys.platform == 'win32' else None
+# Tesseract binary run by pytesseract
+TESSERACT_CMD: Optional[str] = 'tesseract-ocr/tesseract.exe' if sys.platform == 'win32' else None
+
+# Words with a lower confidence are dropped
+MIN_CONFIDENCE = 30
+
+# Columns of the tesseract TSV output
+INT_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height')
+
+
+def parse_tsv(tsv: str) -> Dict[str, List[Union[int, float, str]]]:
+    """
+    Parse the TSV output of tesseract into the same dict as
+    pytesseract.image_to_data(output_type=Output.DICT)
+    """
+    data: Dict[str, List] = {column: [] for column in INT_COLUMNS + ('conf', 'text')}
+    for row in tsv.splitlines():
+        values = row.split('\t')
+        if len(values) < 12 or not values[0].isdigit():
+            # Header or malformed row
+            continue
+        for column, value in zip(INT_COLUMNS, values):
+            data[column].append(int(value))
+        data['conf'].append(float(values[10]))
+        data['text'].append(values[11])
+    return data
+
+
+def compose_sheet(images: List[np.ndarray], gap: int = 20) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """
+    Stack the binarized paragraphs on one white sheet, separated by gap
+    pixels so tesseract reads them as separate blocks. Return the sheet
+    and the (x, y) position of each paragraph on the sheet.
+    """
+    width = max((img.shape[1] for img in images), default=0) + 2 * gap
+    height = sum(img.shape[0] for img in images) + gap * (len(images) + 1)
+    sheet = np.full((height, width), 255, np.uint8)
+
+    positions: List[Tuple[int, int]] = []
+    y = gap
+    for img in images:
+        h, w = img.shape[:2]
+        sheet[y:y + h, gap:gap + w] = img
+        positions.append((gap, y))
+        y += h + gap
+    return sheet, positions
+
+
+def split_data(data: Dict[str, List], positions: List[Tuple[int, int]],
+               heights: List[int]) -> List[Dict[str, List]]:
+    """
+    Split the output of a sheet by paragraph, a row belongs
+    to the paragraph containing its vertical center
+    """
+    parts: List[Dict[str, List]] = [{column: [] for column in data} for _ in positions]
+    tops = [y for _, y in positions]
+    for row in range(len(data['text'])):
+        center = data['top'][row] + data['height'][row] / 2
+        for index, (top, height) in enumerate(zip(tops, heights)):
+            if top <= center < top + height:
+                for column in data:
+                    parts[index][column].append(data[column][row])
+                break
+    return parts
+
+
+def convert_tesserract_output(data, x: int, y: int, min_confidence: float = 0) -> List[Word]:
+    """
+    Convert the output of tesseract to words in image coordinates,
+    the rows without text are dropped.\n
+    min_confidence: drop the words whose confidence is lower\n
+    """
+    texts = data['text']
+    count = len(texts)
+    confs = data['conf'] if 'conf' in data else [100.0] * count
+    # A new line starts when the block, the paragraph or the line number changes
+    structure = zip(*(data[column] if column in data else [0] * count
+                      for column in ('block_num', 'par_num', 'line_num')))
+
+    words: List[Word] = []
+    line = -1
+    previous = None
+    for text, conf, left, top, width, height, key in zip(
+            texts, confs, data['left'], data['top'], data['width'], data['height'], structure):
+        if not text or text.isspace() or float(conf) < min_confidence:
+            continue
+        if key != previous:
+            line += 1
+            previous = key
+        x1 = left + x
+        y1 = top + y
+        words.append(Word(text, x1 - 6, y1 - 6, x1 + width + 6, y1 + height + 6,
+                          width + 6, height + 6, line, float(conf)))
+    return words
+
+
+class TesseractEngine():
+    """
+    Tesseract OCR for one language. The tesseract API handles are kept warm
+    and reused across paragraphs and images. Without tesserocr it falls back
+    to pytesseract, which runs the tesseract binary for each image.
+    """
+
+    def __init__(self, lang: str, tessdata: Optional[str] = TESSDATA_PATH,
+                 use_api: Optional[bool] = None):
+        """
+        lang: tesseract language code\n
+        tessdata: directory of the traineddata files\n
+        use_api: use the in-process API, by default when tesserocr is installed\n
+        """
+        self.lang = lang
+        self.tessdata = tessdata
+        # tesserocr is only imported when the first handle is loaded
+        self.use_api = importlib.util.find_spec('tesserocr') is not None if use_api is None else use_api
+        # An API handle is used by only one thread at a time
+        self._handles: List = []
+        self._lock = threading.Lock()
+
+    def _new_handle(self):
+        import tesserocr
+        log.debug(f'Load tesseract {self.lang}')
+        if self.tessdata is None:
+            return tesserocr.PyTessBaseAPI(lang=self.lang)
+        return tesserocr.PyTessBaseAPI(path=self.tessdata, lang=self.lang)
+
+    @contextmanager
+    def handle(self) -> Iterator:
+        """Borrow a warm API handle"""
+        with self._lock:
+            api = self._handles.pop() if self._handles else None
+        if api is None:
+            api = self._new_handle()
+        try:
+            yield api
+        finally:
+            with self._lock:
+                self._handles.append(api)
+
+    def warmup(self):
+        """Load one API handle"""
+        if self.use_api:
+            with self.handle():
+                pass
+
+    def image_to_data(self, img: Union[np.ndarray, PIL_Img.Image]) -> Dict[str, List]:
+        """
+        Run the OCR and return the words with their boxes
+        like pytesseract.image_to_data(output_type=Output.DICT)
+        """
+        if not self.use_api:
+            import pytesseract
+            if TESSERACT_CMD is not None:
+                pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+            return pytesseract.image_to_data(img, lang=self.lang,
+                                             output_type=pytesseract.Output.DICT)
+
+        if isinstance(img, np.ndarray):
+            img = PIL_Img.fromarray(img)
+        with self.handle() as api:
+            api.SetImage(img)
+            return parse_tsv(api.GetTSVText(0))
+
+    def close(self):
+        with self._lock:
+            for api in self._handles:
+                api.End()
+            self._handles.clear()
+
+
+_ENGINES: Dict[str, TesseractEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_engine(lang: str) -> TesseractEngine:
+    """Return the shared tesseract engine of a language"""
+    with _ENGINES_LOCK:
+        if lang not in _ENGINES:
+            _ENGINES[lang] = TesseractEngine(lang)
+        return _ENGINES[lang]
@@ -34,13 +34,21 @@ class TextBin():
         self.img_y: int = len(img)
         self.img_x: int = len(img[0])
 
+        # Intensity of every pixel, computed once for the whole image
+        self.lum: np.ndarray = TextBin.luminance(img)
+
         self.contours = None
 
+    @staticmethod
+    def luminance(img):
+        # Same operations in the same order as the per pixel version
+        # so the values are bit-identical
+        return 0.30 * img[:, :, 2] + 0.59 * img[:, :, 1] + 0.11 * img[:, :, 0]
+
     def ii(self, xx, yy):
         if yy >= self.img_y or xx >= self.img_x:
             return 0
-        pixel = self.img[yy][xx]
-        return 0.30 * pixel[2] + 0.59 * pixel[1] + 0.11 * pixel[0]
+        return self.lum[yy][xx]
 
     def connected(self, contour):
         first = contour[0][0]
@@ -50,57 +58,87 @@ class TextBin():
     def c(self, index):
         return self.contours[index]
 
-    def count_children(self, index, h_, contour):
-        # No children
-        if h_[index][2] < 0:
-            return 0
-        else:
-            # If the first child is a contour we care about
-            # then count it, otherwise don't
-            if self.keep(self.c(h_[index][2])):
-                count = 1
+    def index_contours(self, h_):
+        """
+        Precompute the keep flag and the bounding rect of each contour,
+        the number of kept children (at any depth) and the nearest kept
+        parent, so the filtering is linear in the number of contours
+        """
+        n = len(self.contours)
+        self.rects = np.array([cv2.boundingRect(contour) for contour in self.contours],
+                              dtype=np.int64).reshape(n, 4)
+
+        # Same test as keep() for all the contours at once
+        w_ = self.rects[:, 2] * 1.0
+        h = self.rects[:, 3] * 1.0
+        ratio = w_ / h
+        area = w_ * h
+        keep_box = (ratio >= 0.1) & (ratio <= 10) & (area <= MAXBLOCKSIZE) & (area >= 15)
+        first = np.array([contour[0][0] for contour in self.contours]).reshape(n, 2)
+        last = np.array([contour[len(contour) - 1][0] for contour in self.contours]).reshape(n, 2)
+        connected = np.all(np.abs(first - last) <= 1, axis=1)
+        self.keep_flags = (keep_box & connected).tolist()
+
+        # Children of each contour, following the sibling links
+        # from the first child like the recursive walk did
+        children = [[] for _ in range(n)]
+        for index in range(n):
+            first_child = h_[index][2]
+            if first_child < 0:
+                continue
+            children[index].append(first_child)
+            p_ = h_[first_child][0]
+            while p_ > 0:
+                children[index].append(p_)
+                p_ = h_[p_][0]
+            n_ = h_[first_child][1]
+            while n_ > 0:
+                children[index].append(n_)
+                n_ = h_[n_][1]
+
+        # Count the kept children bottom-up, a contour is
+        # counted once all its children are counted
+        self.kept_children = [-1] * n
+        for root in range(n):
+            stack = [root]
+            while stack:
+                index = stack[-1]
+                if self.kept_children[index] >= 0:
+                    stack.pop()
+                    continue
+                pending = [child for child in children[index] if self.kept_children[child] < 0]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                self.kept_children[index] = sum(self.keep_flags[child] + self.kept_children[child]
+                                                for child in children[index])
+
+        # Nearest kept parent, the walk stops at the first contours
+        self.parents = [None] * n
+        for index in range(n):
+            chain = []
+            node = index
+            while self.parents[node] is None:
+                parent = h_[node][3]
+                chain.append(node)
+                if parent <= 0 or self.keep_flags[parent]:
+                    resolved = parent
+                    break
+                node = parent
             else:
-                count = 0
-
-                # Also count all of the child's siblings and their children
-            count += self.count_siblings(h_[index][2], h_, contour, True)
-            return count
-
-    def is_child(self, index, h_):
-        return self.get_parent(index, h_) > 0
-
-    def get_parent(self, index, h_):
-        parent = h_[index][3]
-        while not self.keep(self.c(parent)) and parent > 0:
-            parent = h_[parent][3]
-
-        return parent
-
-    def count_siblings(self, index, h_, contour, inc_children=False):
-        # Include the children if necessary
-        if inc_children:
-            count = self.count_children(index, h_, contour)
-        else:
-            count = 0
-
-        # Look ahead
-        p_ = h_[index][0]
-        while p_ > 0:
-            if self.keep(self.c(p_)):
-                count += 1
-            if inc_children:
-                count += self.count_children(p_, h_, contour)
-            p_ = h_[p_][0]
-
-        # Look behind
-        n = h_[index][1]
-        while n > 0:
-            if self.keep(self.c(n)):
-                count += 1
-            if inc_children:
-                count += self.count_children(n, h_, contour)
-            n = h_[n][1]
-        return count
+                resolved = self.parents[node]
+            for node in chain:
+                self.parents[node] = resolved
+
+    def count_children(self, index):
+        return self.kept_children[index]
+
+    def is_child(self, index):
+        return self.get_parent(index) > 0
+
+    def get_parent(self, index):
+        return self.parents[index]
 
     def keep(self, contour):
         return self.keep_box(contour) and self.connected(contour)
@@ -123,12 +161,12 @@ class TextBin():
 
         return True
 
-    def include_box(self, index, h_, contour):
+    def include_box(self, index):
 
-        if self.is_child(index, h_) and self.count_children(self.get_parent(index, h_), h_, contour) <= 4:
+        if self.is_child(index) and self.count_children(self.get_parent(index)) <= 4:
             return False
 
-        if self.count_children(index, h_, contour) > 4:
+        if self.count_children(index) > 4:
             return False
 
         return True
@@ -150,21 +188,19 @@ class TextBin():
         self.contours, hierarchy = cv2.findContours(
             edges.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
 
-        hierarchy = hierarchy[0]
-
         # These are the boxes that we are determining
         keepers = []
 
-        # For each contour, find the bounding rectangle and decide
-        # if it's one we care about
-        for index_, contour_ in enumerate(self.contours):
+        if hierarchy is not None:
+            self.index_contours(hierarchy[0])
 
-            x, y, w, h = cv2.boundingRect(contour_)
+        # For each contour, decide if it's one we care about
+        for index_, contour_ in enumerate(self.contours):
 
             # Check the contour and it's bounding box
-            if self.keep(contour_) and self.include_box(index_, hierarchy, contour_):
+            if self.keep_flags[index_] and self.include_box(index_):
                 # It's a winner!
-                keepers.append([contour_, [x, y, w, h]])
+                keepers.append([contour_, self.rects[index_].tolist()])
         # Make a white copy of our image
         new_image = edges.copy()
         new_image.fill(255)
@@ -174,9 +210,10 @@ class TextBin():
 
             # Find the average intensity of the edge pixels to
             # determine the foreground intensity
-            fg_int = 0.0
-            for p in contour_:
-                fg_int += self.ii(p[0][0], p[0][1])
+            # cumsum adds the values sequentially like the
+            # original loop, a pairwise sum would round differently
+            points = contour_[:, 0]
+            fg_int = np.cumsum(self.lum[points[:, 1], points[:, 0]])[-1]
 
             fg_int /= len(contour_)
 
@@ -219,16 +256,10 @@ class TextBin():
                 fg = 0
                 bg = 255
 
-                # Loop through every pixel in the box and color the
-                # pixel accordingly
-            for x in range(x_, x_ + width):
-                for y in range(y_, y_ + height):
-                    if y >= self.img_y or x >= self.img_x:
-                        continue
-                    if self.ii(x, y) > fg_int:
-                        new_image[y][x] = bg
-                    else:
-                        new_image[y][x] = fg
+            # Color every pixel of the box accordingly,
+            # slicing clips the box to the image
+            region = self.lum[y_:y_ + height, x_:x_ + width]
+            new_image[y_:y_ + height, x_:x_ + width] = np.where(region > fg_int, bg, fg)
         log.debug('End of text binarization')
         # blur a bit to improve ocr accuracy
         new_image = cv2.blur(new_image, (2, 2))
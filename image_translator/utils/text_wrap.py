@@ -0,0 +1,108 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Callable, Dict, List
+from functools import lru_cache
+
+import PIL.ImageFont as PIL_ImgFont
+
+
+def text_width(font: PIL_ImgFont.FreeTypeFont, text: str) -> float:
+    """Width of a text, getsize was removed in Pillow 10"""
+    if hasattr(font, 'getlength'):
+        return font.getlength(text)
+    return font.getsize(text)[0]
+
+
+def line_height(font: PIL_ImgFont.FreeTypeFont) -> int:
+    """Height of a line of text"""
+    if hasattr(font, 'getbbox'):
+        return font.getbbox('hg')[3]
+    return font.getsize('hg')[1]
+
+
+class TextWrapper():
+    """
+    Wrap texts for one font. Each word and the space are measured
+    once and the lines are built from the accumulated widths.
+    """
+
+    def __init__(self, font: PIL_ImgFont.FreeTypeFont):
+        self.font = font
+        self.space: float = text_width(font, ' ')
+        self.line_height: int = line_height(font)
+        self._widths: Dict[str, float] = {}
+
+    def width(self, word: str) -> float:
+        width = self._widths.get(word)
+        if width is None:
+            width = self._widths[word] = text_width(self.font, word)
+        return width
+
+    def wrap(self, text: str, max_width: float) -> List[str]:
+        """
+        Wrap the text into lines not wider than max_width,
+        a word wider than max_width is alone on its line
+        """
+        lines: List[str] = []
+        line: List[str] = []
+        width = 0.0
+        for word in text.split():
+            word_width = self.width(word)
+            if line and width + self.space + word_width > max_width:
+                lines.append(' '.join(line))
+                line = []
+            if line:
+                width += self.space + word_width
+            else:
+                width = word_width
+            line.append(word)
+        if line:
+            lines.append(' '.join(line))
+        return lines
+
+    def fits(self, text: str, max_width: float, max_height: float) -> bool:
+        """Check that the wrapped text fits in the box"""
+        lines = self.wrap(text, max_width)
+        if len(lines) * self.line_height > max_height:
+            return False
+        # Only a word alone on its line can be wider than the box
+        return all(len(line.split()) > 1 or self.width(line) <= max_width for line in lines)
+
+
+@lru_cache(maxsize=128)
+def get_wrapper(font: PIL_ImgFont.FreeTypeFont) -> TextWrapper:
+    """Return the wrapper of a font, the word widths are kept between the calls"""
+    return TextWrapper(font)
+
+
+def fit_font_size(text: str, get_font: Callable[[int], PIL_ImgFont.FreeTypeFont],
+                  max_width: float, max_height: float, min_size: int = 6,
+                  max_size: int = 0) -> int:
+    """
+    Binary search the largest font size whose wrapped text fits in the box.
+    Return min_size if the text doesn't fit at all.\n
+    get_font: return the font of a size\n
+    max_size: largest size tried, the box height by default\n
+    """
+    low = min_size
+    high = max(max_size or int(max_height), min_size)
+    while low < high:
+        size = (low + high + 1) // 2
+        if get_wrapper(get_font(size)).fits(text, max_width, max_height):
+            low = size
+        else:
+            high = size - 1
+    return low
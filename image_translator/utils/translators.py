@@ -0,0 +1,185 @@
+# Copyright (C) 2020  A2va
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from typing import Callable, Dict, List, Optional
+import threading
+import time
+
+from image_translator.utils import batch
+from image_translator.utils import lang
+
+# Logging
+import logging
+log = logging.getLogger('image_translator')
+
+
+class UnknownTranslator(Exception):
+    pass
+
+
+class TranslatorBackend():
+    """
+    Base class of the translators. A backend translates one text or a list
+    of texts, the languages are given with the codes of the backend.
+    The libraries of a backend are imported on its first translation.
+    """
+
+    # Name of the backend in the registry
+    name: str = ''
+    # Column of the backend codes in utils.lang.TRANS_LANG
+    lang_index: int = 0
+    # Maximal length of one request
+    max_length: int = 5000
+    # Whether the backend needs the network
+    online: bool = True
+
+    def lang_code(self, code: str) -> str:
+        """
+        Return the code of a language for this backend, 'invalid' if the
+        backend doesn't have the language. Raise KeyError for an unknown code.
+        """
+        return lang.TRANS_LANG[code][self.lang_index]
+
+    def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        raise NotImplementedError
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        """
+        Translate a list of texts, packed in as few requests as max_length allows
+        """
+        return batch.translate_batch(
+            texts, lambda text: self.translate(text, src_lang, dest_lang), self.max_length)
+
+
+class GoogleBackend(TranslatorBackend):
+    name = 'google'
+    lang_index = 0
+
+    def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        from googletrans import Translator
+        return Translator().translate(text, dest_lang, src_lang).text
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        from googletrans import Translator
+        tra = Translator()
+        return batch.translate_batch(
+            texts, lambda text: tra.translate(text, dest_lang, src_lang).text, self.max_length)
+
+
+class BingBackend(TranslatorBackend):
+    name = 'bing'
+    lang_index = 1
+
+    def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        from image_translator.utils import bing
+        return bing.get_client().translate(text, src_lang, dest_lang)
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        from image_translator.utils import bing
+        return bing.get_client().translate_batch(texts, src_lang, dest_lang)
+
+
+class DeepLBackend(TranslatorBackend):
+    name = 'deepl'
+    lang_index = 2
+
+    def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        from image_translator.utils import deepl
+        return deepl.get_client(src_lang, dest_lang).translate(text)
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        from image_translator.utils import deepl
+        return deepl.get_client(src_lang, dest_lang).translate_batch(texts)
+
+
+class OfflineBackend(TranslatorBackend):
+    """
+    Local stand-in for the translators, to test and benchmark the pipeline
+    without network. Each text is looked up in the dictionary, then each of
+    its words, a word missing from the dictionary is returned unchanged.
+    """
+    name = 'offline'
+    lang_index = 0
+    online = False
+
+    def __init__(self, dictionary: Optional[Dict[str, str]] = None, delay: float = 0.0):
+        """
+        dictionary: translation of the texts and the words\n
+        delay: time spent by each request in seconds, to simulate a translator\n
+        """
+        self.dictionary: Dict[str, str] = dictionary or {}
+        self.delay = delay
+        # Number of requests and of translated characters
+        self.requests = 0
+        self.characters = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> str:
+        if text in self.dictionary:
+            return self.dictionary[text]
+        return ' '.join(self.dictionary.get(word, word) for word in text.split())
+
+    def request(self, length: int):
+        with self._lock:
+            self.requests += 1
+            self.characters += length
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+    def translate(self, text: str, src_lang: str, dest_lang: str) -> str:
+        self.request(len(text))
+        return self.lookup(text)
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        for chunk in batch.pack_texts([batch.clean_text(text) for text in texts], self.max_length):
+            self.request(sum(len(texts[index]) for index in chunk))
+        return [self.lookup(text) for text in texts]
+
+
+_FACTORIES: Dict[str, Callable[[], TranslatorBackend]] = {}
+_BACKENDS: Dict[str, TranslatorBackend] = {}
+_LOCK = threading.Lock()
+
+
+def register(name: str, factory: Callable[[], TranslatorBackend]):
+    """
+    Register a translator, the factory is called on the first use.
+    A backend registered again under the same name replaces the previous one.
+    """
+    with _LOCK:
+        _FACTORIES[name] = factory
+        _BACKENDS.pop(name, None)
+
+
+def get(name: str) -> TranslatorBackend:
+    """Return the shared backend of a translator"""
+    with _LOCK:
+        if name not in _BACKENDS:
+            if name not in _FACTORIES:
+                raise UnknownTranslator(f'Translator {name} is not available')
+            _BACKENDS[name] = _FACTORIES[name]()
+        return _BACKENDS[name]
+
+
+def available() -> List[str]:
+    """Names of the registered translators"""
+    with _LOCK:
+        return list(_FACTORIES)
+
+
+register('google', GoogleBackend)
+register('bing', BingBackend)
+register('deepl', DeepLBackend)
+register('offline', OfflineBackend)
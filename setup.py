@@ -42,6 +42,7 @@ setup(
     packages=find_packages(),
     install_requires=required_packages,
     entry_points={
-        'console_scripts': ['get-components=image_translator.get_components:main']
+        'console_scripts': ['get-components=image_translator.get_components:main',
+                            'image-translator=image_translator.batch_translator:main']
     }
 )
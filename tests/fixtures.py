@@ -0,0 +1,25 @@
+from typing import Any, Callable, Optional
+from unittest import mock
+
+from image_translator.utils import model_registry
+from image_translator.utils import ocr_engines
+from image_translator.utils import tesseract
+from image_translator.utils import translators
+
+
+def patch_registries(test: Any, reader: Optional[Callable[[], Any]] = None):
+    '''
+    Restore the registries of the engines and the translators after the test,
+    reader returns the easyocr reader used instead of the models
+    '''
+    readers = model_registry.READERS
+    if reader is not None:
+        readers = model_registry.ReaderRegistry(loader=lambda *key: reader(), sizer=lambda reader: 0)
+    for patcher in (mock.patch.object(model_registry, 'READERS', readers),
+                    mock.patch.dict(tesseract._ENGINES),
+                    mock.patch.dict(ocr_engines._ENGINE_CLASSES),
+                    mock.patch.dict(ocr_engines._ENGINES),
+                    mock.patch.dict(translators._FACTORIES),
+                    mock.patch.dict(translators._BACKENDS)):
+        patcher.start()
+        test.addCleanup(patcher.stop)
@@ -0,0 +1,65 @@
+import unittest
+
+from image_translator.utils import batch
+
+
+class TestBatch(unittest.TestCase):
+    '''Testing batch translation'''
+
+    def setUp(self):
+        '''Set up a fake translator counting the requests'''
+        self.requests = []
+
+        def translate(text):
+            self.requests.append(text)
+            return text.upper()
+
+        self.translate = translate
+
+    def test_pack(self):
+        '''Texts are packed under the length limit'''
+        chunks = batch.pack_texts(['aaaa', 'bb', 'cccccccc', 'd'], 8)
+
+        self.assertEqual(chunks, [[0, 1], [2], [3]])
+
+    def test_one_request(self):
+        '''A page of paragraphs is sent in one request'''
+        texts = [f'bubble {i}' for i in range(40)]
+        output = batch.translate_batch(texts, self.translate, 5000)
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(output, [text.upper() for text in texts])
+
+    def test_empty_and_newlines(self):
+        '''Empty texts are not sent and line breaks are removed'''
+        output = batch.translate_batch(['a\nb ', '', 'c'], self.translate, 5000)
+
+        self.assertEqual(output, ['A B', '', 'C'])
+        self.assertEqual(self.requests, ['a b\nc'])
+
+    def test_fallback(self):
+        '''Texts are translated one by one when the lines are merged'''
+        def translate(text):
+            self.requests.append(text)
+            return text.replace('\n', ' ')
+
+        output = batch.translate_batch(['a', 'b'], translate, 5000)
+
+        self.assertEqual(output, ['a', 'b'])
+        self.assertEqual(len(self.requests), 3)
+
+    def test_misaligned(self):
+        '''Texts are translated one by one when the lines are shifted'''
+        answers = {'a\nb\nc': 'A B\n\nC', 'a\nb\nc\nd': 'A B\nC\nD1\n\nD2'}
+
+        def translate(text):
+            self.requests.append(text)
+            return answers.get(text, text.upper())
+
+        self.assertEqual(batch.translate_batch(['a', 'b', 'c'], translate, 5000), ['A', 'B', 'C'])
+        self.assertEqual(batch.translate_batch(['a', 'b', 'c', 'd'], translate, 5000), ['A', 'B', 'C', 'D'])
+        self.assertEqual(len(self.requests), 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import cv2
+
+from benchmarks import synthetic
+from image_translator import batch_translator
+from image_translator.utils import ocr_engines
+from tests.fixtures import patch_registries
+
+
+class TestBatchTranslator(unittest.TestCase):
+    '''Testing the batch driver with 2 workers sharing a cache'''
+
+    def setUp(self):
+        # The workers are forked and inherit the stand-ins of the models
+        patch_registries(self, synthetic.ComponentReader)
+        ocr_engines.register('synthetic', synthetic.ComponentOCR)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.in_dir = os.path.join(directory.name, 'in')
+        self.out_dir = os.path.join(directory.name, 'out')
+        self.cache_path = os.path.join(directory.name, 'cache.db')
+        os.makedirs(self.in_dir)
+        for index in range(4):
+            img = synthetic.text_image(500, 400, 1.0, seed=index)[0]
+            cv2.imwrite(os.path.join(self.in_dir, f'page{index}.png'), img)
+        with open(os.path.join(self.in_dir, 'broken.png'), 'wb') as f:
+            f.write(b'not an image')
+
+    def test_translate_images(self):
+        '''The failing image is reported and the others share the cache'''
+        results = list(batch_translator.translate_images(
+            batch_translator.list_images(self.in_dir), self.out_dir, 'synthetic', 'offline',
+            'eng', 'fra', workers=2, cache_path=self.cache_path))
+
+        failed = [result for result in results if result.error is not None]
+        self.assertEqual(len(results), 5)
+        self.assertEqual([os.path.basename(result.path) for result in failed], ['broken.png'])
+        self.assertIn('Unable to read', failed[0].error)
+        self.assertEqual(sorted(os.listdir(self.out_dir)), [f'page{index}.png' for index in range(4)])
+        with sqlite3.connect(self.cache_path) as db:
+            self.assertGreater(db.execute('SELECT COUNT(*) FROM translations').fetchone()[0], 0)
+
+    def test_main(self):
+        '''The command line exits with 1 when an image fails'''
+        argv = ['image-translator', 'batch', self.in_dir, self.out_dir, '--workers', '2',
+                '--ocr', 'synthetic', '--translator', 'offline', '--cache', self.cache_path]
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', argv), redirect_stdout(output):
+            with self.assertRaises(SystemExit) as exit:
+                batch_translator.main()
+
+        self.assertEqual(exit.exception.code, 1)
+        self.assertIn('Error: ' + os.path.join(self.in_dir, 'broken.png'), output.getvalue())
+        self.assertEqual(output.getvalue().count(' -> '), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
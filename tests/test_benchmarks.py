@@ -0,0 +1,48 @@
+import json
+import unittest
+
+import numpy as np
+
+from benchmarks import compare
+from benchmarks import run
+from benchmarks import synthetic
+from tests.fixtures import patch_registries
+
+
+class TestBenchmarks(unittest.TestCase):
+    '''Testing the benchmark of the pipeline on generated images'''
+
+    def setUp(self):
+        # The stand-ins are installed in the registries
+        patch_registries(self)
+
+    def test_text_image(self):
+        '''The same seed gives the same page, the density sets the number of lines'''
+        img, boxes = synthetic.text_image(800, 600, 1.0, seed=3)
+        same, _ = synthetic.text_image(800, 600, 1.0, seed=3)
+        sparse = synthetic.text_image(800, 600, 0.2, seed=3)[1]
+
+        self.assertTrue(np.array_equal(img, same))
+        self.assertEqual(img.shape, (800, 600, 3))
+        self.assertGreater(len(boxes), len(sparse))
+        self.assertTrue(all(0 <= box[0] < box[1] < 600 and 0 <= box[2] < box[3] < 800 for box in boxes))
+
+    def test_run_and_compare(self):
+        '''Every stage is timed with the stand-ins and a slower stage is reported'''
+        report = run.run(sizes=[(500, 400)], densities=[1.0], repeat=1)
+        report = json.loads(json.dumps(report))
+
+        self.assertEqual([result['stage'] for result in report['results']], list(run.STAGES))
+        self.assertEqual(report['meta']['stand_ins'],
+                         {'detect': 'synthetic', 'ocr': 'synthetic', 'translate': 'synthetic'})
+        self.assertGreater(report['results'][0]['paragraphs'], 0)
+
+        slower = json.loads(json.dumps(report))
+        slower['results'][0]['median'] *= 2
+        rows = compare.compare(report, slower, threshold=1.2)
+        self.assertEqual(len(rows), len(run.STAGES))
+        self.assertEqual([row['regression'] for row in rows], [True] + [False] * (len(rows) - 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
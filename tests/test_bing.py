@@ -0,0 +1,167 @@
+import importlib
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from image_translator.utils import bing
+
+
+class TestBingRegion(unittest.TestCase):
+    '''Testing the region detection of bing'''
+
+    def test_no_network_at_import(self):
+        '''Importing the module doesn't connect to the network'''
+        with mock.patch.object(socket.socket, 'connect', side_effect=AssertionError('network access')):
+            importlib.reload(bing)
+
+    def test_override(self):
+        '''The region can be set explicitly'''
+        translator = bing.Bing(region='CN')
+
+        self.assertEqual(translator.request_server_region_info, {'countryCode': 'CN'})
+
+    def test_fallback(self):
+        '''The fallback of the region detection has a timeout and can find nothing'''
+        exceptions = bing.requests.exceptions
+        with mock.patch.object(bing, 'requests') as requests:
+            requests.exceptions = exceptions
+            requests.get.side_effect = [mock.Mock(**{'json.return_value': {'origin': '1.2.3.4'}}),
+                                        requests.exceptions.Timeout()]
+            requests.post.return_value.json.return_value = {'code': 1}
+            self.assertEqual(bing.TranslatorSeverRegion().request_server_region_info, {})
+
+            requests.get.side_effect = [mock.Mock(**{'json.return_value': {'origin': '1.2.3.4'}}),
+                                        requests.exceptions.Timeout()]
+            requests.post.return_value.json.return_value = {'data': {'country_id': 'CN'}}
+            self.assertEqual(bing.TranslatorSeverRegion().request_server_region_info,
+                             {'country_id': 'CN', 'countryCode': 'CN'})
+        self.assertEqual(requests.post.call_args[1]['timeout'], 10)
+
+    def test_offline(self):
+        '''The offline mode never detects the region'''
+        with mock.patch.object(bing, 'TranslatorSeverRegion') as region:
+            self.assertEqual(bing.Bing(offline=True).request_server_region_info, {})
+            region.assert_not_called()
+
+
+class FakeClock():
+    '''Clock of the bing module, sleep moves the time forward'''
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def response(data):
+    result = mock.Mock()
+    result.json.return_value = data
+    return result
+
+
+class TestBingClient(unittest.TestCase):
+    '''Testing the token reuse and the rate limiter of bing'''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(bing, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = bing.Bing(region='US', rate_limiter=bing.RateLimiter(0), token_ttl=100)
+        self.client.session = mock.Mock()
+        self.client.session.get.return_value.text = '<html></html>'
+        self.client.session.post.return_value = response([{'translations': [{'text': 'bonjour'}]}])
+        self.client.get_host_info = mock.Mock(return_value={
+            'iid': 'iid', 'ig': 'ig', 'language_map': {'en': ['en', 'fr'], 'fr': ['en', 'fr']}})
+        self.client.get_tk = mock.Mock(return_value={'key': 1, 'token': 'tk'})
+
+    def test_token_reuse(self):
+        '''The host page is fetched once for several requests'''
+        self.assertEqual(self.client.translate('hello', 'en', 'fr'), 'bonjour')
+        self.assertEqual(self.client.translate('hello', 'en', 'fr'), 'bonjour')
+
+        self.assertEqual(self.client.session.get.call_count, 1)
+        self.assertEqual(self.client.session.post.call_count, 2)
+        self.assertTrue(self.client.session.post.call_args[0][0].endswith('IID=iid.2'))
+
+    def test_ttl_expiry(self):
+        '''The token is fetched again after its TTL'''
+        self.client.translate('hello', 'en', 'fr')
+        self.clock.now += 50
+        self.client.translate('hello', 'en', 'fr')
+        self.assertEqual(self.client.session.get.call_count, 1)
+
+        self.clock.now += 100
+        self.client.translate('hello', 'en', 'fr')
+        self.assertEqual(self.client.session.get.call_count, 2)
+        self.assertEqual(self.client.query_count, 1)
+
+    def test_refresh_after_failure(self):
+        '''An error response refreshes the token and retries once'''
+        self.client.translate('hello', 'en', 'fr')
+        self.client.session.post.side_effect = [
+            response({'statusCode': 205}), response([{'translations': [{'text': 'salut'}]}])]
+
+        self.assertEqual(self.client.translate('hi', 'en', 'fr'), 'salut')
+        self.assertEqual(self.client.session.get.call_count, 2)
+        self.assertEqual(self.client.session.post.call_count, 3)
+
+    def test_threads(self):
+        '''The threads sharing the client get distinct request ids'''
+        iids = []
+        self.client.session.post.side_effect = lambda url, **kwargs: (
+            iids.append(url.rsplit('.', 1)[1]), response([{'translations': [{'text': 'ok'}]}]))[1]
+        threads = [threading.Thread(target=self.client.translate, args=('hello', 'en', 'fr'))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.client.session.get.call_count, 1)
+        self.assertEqual(sorted(iids, key=int), [str(index) for index in range(1, 9)])
+
+    def test_concurrent_requests(self):
+        '''The requests of the threads are not serialized by the client'''
+        self.client.translate('hello', 'en', 'fr')
+        # Each request waits for the other one, serialized requests break the barrier
+        barrier = threading.Barrier(2, timeout=2)
+        self.client.session.post.side_effect = lambda url, **kwargs: (
+            barrier.wait(), response([{'translations': [{'text': 'ok'}]}]))[1]
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.translate('hi', 'en', 'fr')))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual(results, ['ok', 'ok'])
+
+    def test_rate_limiter(self):
+        '''The requests are spaced by the minimal interval'''
+        limiter = bing.RateLimiter(min_interval=0.5)
+        limiter.wait()
+        self.clock.now += 0.2
+        limiter.wait()
+        self.clock.now += 1
+        limiter.wait()
+
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from image_translator.utils.cache import TranslationCache
+
+
+class TestTranslationCache(unittest.TestCase):
+    '''Testing the translation cache'''
+
+    def test_memory(self):
+        '''Translations are found with normalized text'''
+        cache = TranslationCache()
+        cache.set('google', 'en', 'fr', 'This is  a test', 'Ceci est un test')
+
+        self.assertEqual(cache.get('google', 'en', 'fr', ' This is a test\n'), 'Ceci est un test')
+        self.assertIsNone(cache.get('bing', 'en', 'fr', 'This is a test'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru(self):
+        '''Least recently used translations are dropped'''
+        cache = TranslationCache(max_size=2)
+        cache.set('google', 'en', 'fr', 'a', 'A')
+        cache.set('google', 'en', 'fr', 'b', 'B')
+        cache.get('google', 'en', 'fr', 'a')
+        cache.set('google', 'en', 'fr', 'c', 'C')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('google', 'en', 'fr', 'b'))
+
+    def test_persistent(self):
+        '''Translations survive a restart with the SQLite tier'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.db')
+            cache = TranslationCache(path=path)
+            cache.set('deepl', 'en', 'de', 'Hello', 'Hallo')
+            cache.close()
+
+            cache = TranslationCache(path=path)
+            self.assertEqual(cache.get('deepl', 'en', 'de', 'Hello'), 'Hallo')
+            cache.close()
+
+    def test_locked(self):
+        '''A write on a locked database is only kept in memory'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.db')
+            cache = TranslationCache(path=path, timeout=0.1)
+            other = sqlite3.connect(path)
+            other.execute('BEGIN IMMEDIATE')
+            with self.assertLogs('image_translator', 'WARNING'):
+                cache.set('bing', 'en', 'fr', 'Hello', 'Bonjour')
+            other.rollback()
+            other.close()
+
+            self.assertEqual(cache.get('bing', 'en', 'fr', 'Hello'), 'Bonjour')
+            cache.set('bing', 'en', 'fr', 'Cat', 'Chat')
+            cache.close()
+            cache = TranslationCache(path=path)
+            self.assertIsNone(cache.get('bing', 'en', 'fr', 'Hello'))
+            self.assertEqual(cache.get('bing', 'en', 'fr', 'Cat'), 'Chat')
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from image_translator.utils import deepl
+
+
+class FakePage():
+    '''Page translating the source to upper case'''
+
+    def __init__(self):
+        self.source = ''
+        self.closed = False
+        self.fail = False
+        # Delay of the translation and number of updates of the target
+        self.delay = 0
+        self.updates = 0
+        # The target never stops changing
+        self.rotate = False
+
+    def isClosed(self):
+        return self.closed
+
+    def setDefaultNavigationTimeout(self, timeout):
+        pass
+
+    async def goto(self, url, options):
+        pass
+
+    async def waitForSelector(self, selector, options):
+        pass
+
+    async def waitForFunction(self, script, options):
+        if self.fail:
+            raise TimeoutError('translation timeout')
+        await asyncio.sleep(self.delay)
+
+    async def evaluate(self, script, *args):
+        if len(args) == 2:
+            self.source = args[1]
+            return None
+        self.updates += 1
+        if self.rotate:
+            return f'{self.source.upper()} {self.updates}'
+        return self.source.upper()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser():
+    def __init__(self):
+        self.pages = []
+        self.closed = False
+
+    async def newPage(self):
+        self.pages.append(FakePage())
+        return self.pages[-1]
+
+    async def close(self):
+        self.closed = True
+
+
+class TestDeepL(unittest.TestCase):
+    '''Testing the browser and the page pool of deepl with a fake browser'''
+
+    def setUp(self):
+        self.launches = 0
+        self.browser = FakeBrowser()
+        self.client = deepl.DeepL('en', 'fr', pool_size=2, timeout=5)
+        self.client.get_ppbrowser = self.get_ppbrowser
+        patcher = mock.patch.object(deepl, 'STABLE_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.client.close)
+
+    async def get_ppbrowser(self):
+        self.launches += 1
+        # Let the concurrent callers reach the launch
+        await asyncio.sleep(0.05)
+        return self.browser
+
+    def test_pool_reuse(self):
+        '''The pages of the pool are reused between the translations'''
+        for text in ['one', 'two', 'three', 'four']:
+            self.assertEqual(self.client.translate(text), text.upper())
+
+        self.assertEqual(self.launches, 1)
+        self.assertEqual(len(self.browser.pages), 2)
+
+    def test_shared_launch(self):
+        '''Concurrent callers wait for the same launch of the browser'''
+        texts = [f'text {index}' for index in range(6)]
+        with ThreadPoolExecutor(6) as executor:
+            results = list(executor.map(self.client.translate, texts))
+
+        self.assertEqual(results, [text.upper() for text in texts])
+        self.assertEqual(self.launches, 1)
+        self.assertEqual(len(self.browser.pages), 2)
+
+    def test_replace_page_after_error(self):
+        '''A page failing a translation is closed and replaced'''
+        self.client.translate('warm')
+        for page in self.browser.pages:
+            page.fail = True
+        with self.assertRaises(TimeoutError):
+            self.client.translate('fail')
+        for page in self.browser.pages:
+            page.fail = False
+
+        self.assertEqual(sum(page.closed for page in self.browser.pages), 1)
+        for text in ['one', 'two', 'three']:
+            self.assertEqual(self.client.translate(text), text.upper())
+        self.assertEqual(len(self.browser.pages), 3)
+        self.assertEqual(self.launches, 1)
+
+    def test_changing_translation(self):
+        '''A translation that never stops changing is returned after the timeout'''
+        self.client.timeout = 0.3
+        self.client.translate('warm')
+        for page in self.browser.pages:
+            page.rotate = True
+
+        then = time.monotonic()
+        self.assertTrue(self.client.translate('one').startswith('ONE '))
+        self.assertLess(time.monotonic() - then, 2)
+
+    def test_close_during_translation(self):
+        '''A translation running while the client closes returns its result'''
+        self.client.translate('warm')
+        for page in self.browser.pages:
+            page.delay = 0.2
+        with ThreadPoolExecutor(1) as executor:
+            result = executor.submit(self.client.translate, 'one')
+            time.sleep(0.05)
+            self.client._run(self.client.close_async())
+            self.assertEqual(result.result(), 'ONE')
+        self.assertIsNone(self.client.pages)
+
+    def test_close(self):
+        '''close shuts the browser and the loop, close_all every engine'''
+        self.client.translate('one')
+        self.assertIn(self.client, deepl._ENGINES)
+        self.client.close()
+
+        self.assertTrue(self.browser.closed)
+        self.assertIsNone(self.client.loop)
+        self.assertNotIn(self.client, deepl._ENGINES)
+        # Closing twice does nothing
+        self.client.close()
+
+        other = deepl.DeepL('en', 'de')
+        other.get_ppbrowser = self.get_ppbrowser
+        other.translate('two')
+        with mock.patch.dict(deepl._CLIENTS, {('en', 'de'): other}):
+            deepl.close_all()
+            self.assertEqual(deepl._CLIENTS, {})
+        self.assertIsNone(other.loop)
+        self.assertNotIn(other, deepl._ENGINES)
+
+
+if __name__ == '__main__':
+    unittest.main()
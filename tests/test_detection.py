@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from image_translator.utils import detection
+
+
+class FakeReader():
+    '''Detect one box at a fixed fraction of the image'''
+
+    def __init__(self):
+        self.shapes = []
+
+    def detect(self, img):
+        self.shapes.append(img.shape[:2])
+        height, width = img.shape[:2]
+        return [[width // 4, width // 2, height // 4, height // 2]], [[[0, 0], [width, 0], [width, height], [0, height]]]
+
+
+class TestDetection(unittest.TestCase):
+    '''Testing the downscaled text detection'''
+
+    def test_factor(self):
+        '''The factor respects the max side and never upscales'''
+        self.assertEqual(detection.detection_factor((6000, 4000, 3), 1500), 0.25)
+        self.assertEqual(detection.detection_factor((600, 400, 3), 1500), 1.0)
+        self.assertEqual(detection.detection_factor((600, 400, 3), None, 0.5), 0.5)
+
+    def test_boxes_in_source_coordinates(self):
+        '''Detection runs on the small copy and boxes are scaled back'''
+        reader = FakeReader()
+        img = np.zeros((4000, 2000, 3), np.uint8)
+        horizontal, free = detection.detect_boxes(reader, img, max_side=1000)
+
+        self.assertEqual(reader.shapes, [(1000, 500)])
+        self.assertEqual(horizontal, [[500, 1000, 1000, 2000]])
+        self.assertEqual(free[0][2], [2000, 4000])
+
+    def test_tiled_seam(self):
+        '''A line in the overlap of two tiles is kept once'''
+        bands = detection.tile_bands(3000, 1000, 200)
+        self.assertEqual([band[:2] for band in bands], [(0, 1000), (800, 1800), (1600, 2600), (2400, 3000)])
+
+        class LineReader():
+            '''One text line at 900-940 of the image, the tiles are detected in order'''
+
+            def __init__(self):
+                self.starts = iter(band[0] for band in bands)
+                self.shapes = []
+
+            def detect(self, img):
+                start = next(self.starts)
+                self.shapes.append(img.shape[:2])
+                if start <= 900 and start + img.shape[0] >= 940:
+                    return [[10, 300, 900 - start, 940 - start]], []
+                return [], []
+
+        reader = LineReader()
+        img = np.zeros((3000, 400, 3), np.uint8)
+        horizontal, _ = detection.detect_boxes_tiled(reader, img, 1000, 200)
+
+        self.assertEqual(horizontal, [[10, 300, 900, 940]])
+        self.assertTrue(all(shape[0] <= 1000 for shape in reader.shapes))
+
+    def test_tile_overlap(self):
+        '''The overlap must be smaller than the tile'''
+        self.assertEqual(len(detection.tile_bands(1000, 400, 0)), 3)
+        for overlap in (-1, 400, 500):
+            with self.assertRaises(ValueError):
+                detection.tile_bands(1000, 400, overlap)
+
+    def test_merge_and_group(self):
+        '''Duplicated boxes are merged and close boxes form one paragraph'''
+        merged = detection.merge_boxes([[0, 100, 0, 20], [2, 100, 1, 21], [0, 50, 100, 120]])
+        self.assertEqual(merged, [[0, 100, 0, 21], [0, 50, 100, 120]])
+
+        boxes = [[10, 100, 10, 30], [10, 90, 35, 55], [10, 100, 200, 220]]
+        paragraphs = detection.group_boxes(boxes, (300, 200))
+        self.assertEqual([len(members) for _, members in paragraphs], [2, 1])
+        self.assertEqual(paragraphs[0][0], [1, 1, 109, 64])
+
+
+if __name__ == '__main__':
+    unittest.main()
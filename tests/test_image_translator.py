@@ -0,0 +1,241 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+from benchmarks import synthetic
+from image_translator.image_translator import ImageTranslator
+from image_translator.utils import detection
+from image_translator.utils import ocr_engines
+from image_translator.utils import translators
+from tests.fixtures import patch_registries
+
+
+def page():
+    '''Three paragraphs of two text lines on a white page'''
+    img = np.full((420, 500, 3), 255, np.uint8)
+    for top in (30, 170, 310):
+        for line in range(2):
+            cv2.putText(img, 'some text here', (30 + 20 * line, top + 25 + 35 * line),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2)
+    return img
+
+
+class LineReader(synthetic.ComponentReader):
+    '''Detection reader returning the text lines and recording the recognitions'''
+
+    def __init__(self):
+        super().__init__()
+        self.recognized = []
+
+    def recognize(self, img, horizontal_list, free_list, **kwargs):
+        self.recognized.append((img, horizontal_list, free_list))
+        return super().recognize(img, horizontal_list, free_list, **kwargs)
+
+
+class FreeReader(LineReader):
+    '''Detection reader finding a rotated box right of the first paragraph'''
+    box = [[360, 45], [420, 55], [415, 85], [355, 75]]
+
+    def detect(self, img, **kwargs):
+        return [box for box in synthetic.component_boxes(img) if box[0] < 340], [self.box]
+
+
+class SlowOCR(ocr_engines.OCREngine):
+    '''Read each word as its width, the first crops are the slowest'''
+    name = 'fake'
+    lang_index = 1
+
+    def __init__(self, lang_code, gpu=False):
+        super().__init__(lang_code, gpu)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def recognize(self, crop):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            delay = max(0.0, 0.06 - 0.02 * self.calls)
+            self.calls += 1
+        time.sleep(delay)
+        words = ocr_engines.convert_easyocr_output(
+            [synthetic.easyocr_item(box) for box in synthetic.component_boxes(crop, (9, 3))])
+        with self.lock:
+            self.active -= 1
+        return words
+
+
+class CountingBackend(translators.OfflineBackend):
+    '''Offline translator recording its concurrency'''
+
+    def __init__(self):
+        super().__init__(delay=0.02)
+        self.active = 0
+        self.peak = 0
+
+    def translate(self, text, src_lang, dest_lang):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return 'fr ' + super().translate(text, src_lang, dest_lang)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def translate_batch(self, texts, src_lang, dest_lang):
+        return [self.translate(text, src_lang, dest_lang) for text in texts]
+
+
+class TestImageTranslator(unittest.TestCase):
+    '''Testing the pipeline with a fake detection, ocr and translator'''
+
+    def setUp(self):
+        self.reader = LineReader()
+        patch_registries(self, lambda: self.reader)
+        ocr_engines.register('fake', SlowOCR)
+        translators.register('fake', CountingBackend)
+
+    def translator(self, **kwargs):
+        return ImageTranslator(page(), 'fake', 'fake', 'eng', 'fra', **kwargs)
+
+    def test_aprocess(self):
+        '''The async pipeline keeps the order, the limits and the output of processing'''
+        expected = self.translator()
+        expected.processing()
+        expected_out = expected.translate()
+
+        engine = ocr_engines.get('fake', 'en')
+        backend = translators.get('fake')
+        engine.calls = engine.peak = backend.peak = 0
+        result = self.translator()
+        asyncio.run(result.aprocess(ocr_concurrency=2, translate_concurrency=1))
+        out = result.translate()
+
+        self.assertEqual(len(result.get_text()), 3)
+        self.assertEqual([(item['dx'], item['dy'], item['text'], item['translated_text'])
+                          for item in result.get_text()],
+                         [(item['dx'], item['dy'], item['text'], item['translated_text'])
+                          for item in expected.get_text()])
+        self.assertTrue(all(item['translated_text'].startswith('fr w') for item in result.get_text()))
+        self.assertLessEqual(engine.peak, 2)
+        self.assertEqual(backend.peak, 1)
+        self.assertTrue(np.array_equal(out, expected_out))
+
+    def test_remove_text(self):
+        '''The whole paragraph box is cleared when its first word is indented'''
+        img = np.full((200, 500, 3), 230, np.uint8)
+        cv2.putText(img, 'indented', (150, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2)
+        cv2.putText(img, 'a wide second line', (20, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (20, 20, 20), 2)
+        translator = ImageTranslator(img, 'fake', 'fake', 'eng', 'fra')
+        translator.processing()
+
+        self.assertEqual(len(translator.get_text()), 1)
+        paragraph = translator.get_text()[0]
+        self.assertGreater(paragraph['word_list'][0]['x1'], paragraph['dx'] + 100)
+        box = np.zeros(img.shape[:2], bool)
+        box[paragraph['dy']:paragraph['dy'] + paragraph['dh'], paragraph['dx']:paragraph['dx'] + paragraph['dw']] = True
+        self.assertTrue((translator.img_process[box] == 255).all())
+        # Nothing outside the paragraph box is cleared
+        self.assertTrue((translator.img_process[~box] == 230).all())
+
+    def test_single_pass(self):
+        '''The boxes recognized once per page are mapped back to their paragraph'''
+        translator = ImageTranslator(page(), 'easyocr', 'fake', 'eng', 'fra', single_pass=True)
+        translator.processing()
+
+        self.assertEqual(len(self.reader.recognized), 1)
+        self.assertEqual(len(translator.get_text()), 3)
+        found = []
+        for paragraph in translator.get_text():
+            boxes = sorted([word['x1'] + 6, word['x2'] - 6, word['y1'] + 6, word['y2'] - 6]
+                           for word in paragraph['word_list'])
+            expected = sorted(box for box in translator.horizontal_list
+                              if paragraph['dy'] <= (box[2] + box[3]) / 2 < paragraph['dy'] + paragraph['dh'])
+            self.assertEqual(len(boxes), 2)
+            self.assertEqual(boxes, expected)
+            self.assertEqual(paragraph['text'].split(),
+                             [synthetic.box_text(box) for box in
+                              sorted(expected, key=lambda box: box[2])])
+            found.extend(boxes)
+        self.assertEqual(sorted(found), sorted(translator.horizontal_list))
+
+    def test_single_pass_free_boxes(self):
+        '''The rotated boxes are recognized on the sheet and mapped back to the image'''
+        self.reader = FreeReader()
+        img = page()
+        cv2.polylines(img, [np.array(FreeReader.box, np.int32)], True, (20, 20, 20), 3)
+        translator = ImageTranslator(img, 'easyocr', 'fake', 'eng', 'fra', single_pass=True)
+        translator.processing()
+
+        self.assertEqual(len(self.reader.recognized), 1)
+        sheet, horizontal_list, free_list = self.reader.recognized[0]
+        self.assertEqual(len(horizontal_list), len(translator.horizontal_list))
+        self.assertEqual(len(free_list), 1)
+        # The box is moved on the sheet around the drawn outline
+        x_min, x_max, y_min, y_max = detection.free_box_rect(free_list[0])
+        ink = (sheet[y_min - 3:y_max + 4, x_min - 3:x_max + 4] < 128).sum()
+        self.assertGreater(ink, 100)
+        self.assertEqual(ink, (sheet[y_min - 12:y_max + 13] < 128).sum())
+
+        text = synthetic.box_text(detection.free_box_rect(FreeReader.box))
+        words = [word for paragraph in translator.get_text() for word in paragraph['word_list']
+                 if word['text'] == text]
+        self.assertEqual(len(words), 1)
+        self.assertEqual([words[0]['x1'] + 6, words[0]['y1'] + 6, words[0]['x2'] - 6, words[0]['y2'] - 6],
+                         [360, 45, 415, 85])
+
+    def test_tiled(self):
+        '''The paragraphs on the seams of the tiles are found once, the output is the untiled one'''
+        img = np.tile(page(), (4, 1, 1))
+        full = ImageTranslator(img, 'fake', 'fake', 'eng', 'fra')
+        full_out = full.translate()
+        tiled = ImageTranslator(img, 'fake', 'fake', 'eng', 'fra', tile_height=400, tile_overlap=120)
+        tiled_out = tiled.translate()
+
+        self.assertIsNone(tiled.mask_paragraph)
+        # The paragraph at 310-386 is split by the seam at 340 of the first two tiles
+        bands = detection.tile_bands(img.shape[0], 400, 120)
+        self.assertTrue(any(paragraph['dy'] < band[3] < paragraph['dy'] + paragraph['dh']
+                            for paragraph in tiled.get_text() for band in bands[:-1]))
+        self.assertEqual(len(tiled.get_text()), 12)
+        self.assertEqual(sorted((item['dx'], item['dy'], item['dw'], item['dh'], item['text'])
+                                for item in tiled.get_text()),
+                         sorted((item['dx'], item['dy'], item['dw'], item['dh'], item['text'])
+                                for item in full.get_text()))
+        self.assertTrue(np.array_equal(tiled_out, full_out))
+
+    def test_tile_overlap(self):
+        '''The overlap is checked by the constructor'''
+        with self.assertRaises(ValueError):
+            ImageTranslator(page(), 'fake', 'fake', 'eng', 'fra', tile_height=150)
+
+    def test_lean(self):
+        '''The lean mode doesn't copy the input, drops the crops and lowers the peak memory'''
+        img = np.tile(page(), (4, 1, 1))
+        full = ImageTranslator(img, 'fake', 'fake', 'eng', 'fra', track_memory=True)
+        full_out = full.translate()
+        lean = ImageTranslator(img, 'fake', 'fake', 'eng', 'fra', lean=True,
+                               track_memory=True, release_crops=True)
+        lean_out = lean.translate()
+
+        self.assertTrue(np.shares_memory(lean.img_process, lean.img))
+        self.assertFalse(lean.img_process.flags.writeable)
+        self.assertEqual(len(lean.get_text()), 12)
+        for paragraph in lean.get_text():
+            self.assertNotIn('image', paragraph)
+            self.assertNotIn('bin_image', paragraph)
+        self.assertTrue(np.array_equal(lean_out, full_out))
+
+        self.assertIsNone(self.translator().peak_memory)
+        self.assertGreater(lean.peak_memory, 0)
+        self.assertLess(lean.peak_memory, full.peak_memory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Modules only imported when their backend is used
+HEAVY_MODULES = ['torch', 'easyocr', 'pyppeteer', 'googletrans', 'pytesseract', 'tesserocr',
+                 'js2py', 'image_translator.utils.bing', 'image_translator.utils.deepl']
+
+SCRIPT = '''
+import json, sys
+from timeit import default_timer
+then = default_timer()
+import image_translator.image_translator
+seconds = default_timer() - then
+with open(sys.argv[1], 'w') as f:
+    json.dump({'seconds': seconds, 'modules': [name for name in %r if name in sys.modules]}, f)
+''' % HEAVY_MODULES
+
+
+class TestImports(unittest.TestCase):
+    '''Testing the cold import of the package'''
+
+    def test_lazy_backends(self):
+        '''The package is imported without the OCR and translator backends'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'imports.json')
+            subprocess.run([sys.executable, '-c', SCRIPT, path], check=True, capture_output=True)
+            with open(path) as f:
+                result = json.load(f)
+
+        self.assertEqual(result['modules'], [])
+        self.assertLess(result['seconds'], 5.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
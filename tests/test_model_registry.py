@@ -0,0 +1,49 @@
+import unittest
+
+from image_translator.utils.model_registry import ReaderRegistry
+
+
+class TestReaderRegistry(unittest.TestCase):
+    '''Testing the easyocr reader registry'''
+
+    def setUp(self):
+        '''Set up a registry with a fake loader'''
+        self.loaded = []
+
+        def loader(lang_list, gpu, model_dir):
+            self.loaded.append((lang_list, gpu, model_dir))
+            return object()
+
+        self.registry = ReaderRegistry(loader=loader, sizer=lambda reader: 100)
+
+    def test_load_once(self):
+        '''A reader is loaded once per key'''
+        first = self.registry.get(['en', 'fr'])
+        second = self.registry.get(['fr', 'en'])
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.loaded), 1)
+
+    def test_warmup(self):
+        '''Warmup loads every language set'''
+        self.registry.warmup([['en'], ['ja']])
+
+        self.assertEqual(len(self.registry), 2)
+        self.registry.get(['ja'])
+        self.assertEqual(len(self.loaded), 2)
+
+    def test_eviction(self):
+        '''Least recently used readers are evicted under the memory cap'''
+        self.registry.set_max_memory(200)
+        self.registry.get(['en'])
+        self.registry.get(['fr'])
+        self.registry.get(['en'])
+        self.registry.get(['de'])
+
+        self.assertEqual(len(self.registry), 2)
+        self.assertIn(ReaderRegistry.make_key(['en']), self.registry)
+        self.assertNotIn(ReaderRegistry.make_key(['fr']), self.registry)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+
+from benchmarks import synthetic
+from image_translator.types import Paragraph, Word
+from image_translator.utils import ocr_engines
+from image_translator.utils import tesseract
+from tests.fixtures import patch_registries
+
+
+def components(img):
+    '''Boxes [x_min, x_max, y_min, y_max] of the black blobs'''
+    return synthetic.component_boxes(img, (1, 1))
+
+
+class FakeTesseract():
+    '''Read each blob as a word named by its size'''
+
+    def image_to_data(self, img):
+        boxes = components(img)
+        return {'text': [synthetic.box_text(box) for box in boxes],
+                'conf': [90.0] * len(boxes),
+                'left': [box[0] for box in boxes], 'top': [box[2] for box in boxes],
+                'width': [box[1] - box[0] for box in boxes], 'height': [box[3] - box[2] for box in boxes],
+                'block_num': [1] * len(boxes), 'par_num': [1] * len(boxes), 'line_num': [1] * len(boxes)}
+
+
+class FakeEasyOCR(ocr_engines.EasyOCR):
+    def reader(self):
+        # Each blob is a word
+        return synthetic.ComponentReader(join=(1, 1))
+
+
+def crops():
+    images = []
+    for width, height in ((120, 40), (60, 80), (200, 30)):
+        img = np.full((height, width), 255, np.uint8)
+        img[5:15, 5:25] = 0
+        img[height - 15:height - 5, width - 40:width - 10] = 0
+        images.append(img)
+    return images
+
+
+class TestOCREngines(unittest.TestCase):
+    '''Testing the OCR engines and the paragraph assembler'''
+
+    def setUp(self):
+        patch_registries(self)
+
+    def test_tesseract_batch(self):
+        '''The sheet gives the same words as the crops read one by one'''
+        tesseract._ENGINES['fake'] = FakeTesseract()
+        engine = ocr_engines.TesseractOCR('fake')
+        images = crops()
+        single = [[word.to_dict() for word in engine.recognize(img)] for img in images]
+        batch = [[word.to_dict() for word in words] for words in engine.recognize_batch(images)]
+        self.assertEqual(single, batch)
+        self.assertEqual(single[0][0]['x1'], 5 - 6)
+
+    def test_easyocr_batch(self):
+        '''The boxes of the detection are read on the sheet'''
+        engine = FakeEasyOCR('en')
+        images = crops()
+        single = [[word.to_dict() for word in engine.recognize(img)] for img in images]
+        batch = [[word.to_dict() for word in words] for words in engine.recognize_batch(images)]
+        boxes = [components(img) for img in images]
+        detected = [[word.to_dict() for word in words] for words in engine.recognize_batch(images, boxes)]
+        self.assertEqual(single, batch)
+        self.assertEqual(single, detected)
+
+    def test_fill_paragraph(self):
+        '''The words are moved to the image and filtered by confidence'''
+        words = [Word('Hello', 0, 0, 30, 20, 30, 20, conf=90.0), Word('xx', 40, 0, 60, 20, 20, 20, conf=10.0)]
+        paragraph = ocr_engines.fill_paragraph(Paragraph(dx=100, dy=50, w=200, h=40), words, 30)
+        self.assertEqual(paragraph['text'], 'Hello ')
+        self.assertEqual((paragraph['x'], paragraph['y']), (100 - 40, 50 - 15))
+        self.assertEqual(paragraph['word_list'][0]['x2'], 130)
+        self.assertEqual(paragraph['font_size'], 22)
+
+        empty = ocr_engines.fill_paragraph(Paragraph(dx=1, dy=2, w=3, h=4), [])
+        self.assertEqual((empty['text'], empty['x'], empty['font_size']), ('', 1, 0))
+
+    def test_registry(self):
+        '''Unknown engines are rejected and the engines are shared'''
+        self.assertIs(ocr_engines.get('tesseract', 'eng'), ocr_engines.get('tesseract', 'eng'))
+        self.assertEqual(ocr_engines.engine_class('easyocr').lang_code_of('chi_sim'), 'ch_sim')
+        with self.assertRaises(ocr_engines.UnknownOCR):
+            ocr_engines.get('unknown', 'eng')
+
+
+if __name__ == '__main__':
+    unittest.main()
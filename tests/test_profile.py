@@ -0,0 +1,46 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from image_translator.utils.profile import Profile, timed
+
+
+class Stages():
+    def __init__(self):
+        self.profile = Profile()
+
+    @timed('ocr')
+    def ocr(self):
+        time.sleep(0.02)
+        with self.profile.stage('binarize'):
+            time.sleep(0.03)
+
+
+class TestProfile(unittest.TestCase):
+    '''Testing the stage timing and the counters'''
+
+    def test_nested_stages(self):
+        '''The inner stage time is not counted in the outer stage'''
+        stages = Stages()
+        stages.ocr()
+        profile = stages.profile.to_dict()
+
+        self.assertGreaterEqual(profile['seconds']['binarize'], 0.03)
+        self.assertGreaterEqual(profile['seconds']['ocr'], 0.02)
+        self.assertLess(profile['seconds']['ocr'], 0.03)
+        self.assertAlmostEqual(profile['total'], sum(profile['seconds'].values()))
+
+    def test_threads(self):
+        '''The stages and counters of several threads add up'''
+        stages = Stages()
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(lambda _: (stages.ocr(), stages.profile.count('words', 2)), range(4)))
+        profile = stages.profile.to_dict()
+
+        self.assertGreaterEqual(profile['seconds']['binarize'], 4 * 0.03)
+        self.assertEqual(profile['counts']['words'], 8)
+        self.assertEqual(profile['counts']['cache_hits'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
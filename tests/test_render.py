@@ -0,0 +1,69 @@
+import os
+import unittest
+
+import numpy as np
+
+from image_translator.types import Paragraph
+from image_translator.utils.render import Renderer, get_font
+from image_translator.utils.text_wrap import text_width
+
+FONT_PATH = os.path.join(os.path.dirname(__file__), '..', 'font', 'Cantarell.ttf')
+
+
+def paragraphs():
+    return [
+        Paragraph(x=20, y=10, w=160, h=90, text='a', max_width=160, font_size=18,
+                  text_color=(0, 0, 255), translated_text='The quick brown fox jumps over the lazy dog'),
+        Paragraph(x=210, y=45, w=80, h=60, text='b', max_width=80, font_size=14,
+                  text_color=(255, 0, 0), translated_text='Seam crossing paragraph text'),
+        # Not drawn, the ocr found no text
+        Paragraph(x=0, y=0, w=300, h=150, text='', max_width=300, font_size=30,
+                  text_color=(0, 0, 0), translated_text='hidden'),
+    ]
+
+
+class TestRender(unittest.TestCase):
+    '''Testing the rendering of the translated paragraphs'''
+
+    def setUp(self):
+        self.renderer = Renderer(font_path=FONT_PATH)
+        self.canvas = np.full((150, 300, 3), 255, np.uint8)
+
+    def test_layout(self):
+        '''The text is wrapped to the max width with the font size of the paragraph'''
+        paragraph = paragraphs()[0]
+        font, lines, height = self.renderer.layout(paragraph)
+
+        self.assertIs(font, get_font(FONT_PATH, 18))
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(' '.join(lines), paragraph['translated_text'])
+        for line in lines:
+            self.assertLessEqual(text_width(font, line), paragraph['max_width'] + 1)
+
+    def test_placement(self):
+        '''The paragraphs are drawn in their box with their color'''
+        out = self.renderer.render(self.canvas.copy(), paragraphs())
+        drawn = np.any(out != 255, axis=2)
+
+        boxes = np.zeros_like(drawn)
+        for paragraph in paragraphs()[:2]:
+            lines, height = self.renderer.layout(paragraph)[1:]
+            boxes[paragraph['y']:paragraph['y'] + len(lines) * height,
+                  paragraph['x']:paragraph['x'] + paragraph['max_width'] + 1] = True
+        self.assertTrue(drawn[10:40, 20:180].any())
+        self.assertTrue(drawn[45:105, 210:290].any())
+        self.assertFalse((drawn & ~boxes).any())
+        # The colors are BGR in the paragraph and drawn in the channels of the image
+        self.assertEqual(out[10:40, 20:180, 0].min(), 255)
+        self.assertEqual(out[45:105, 210:290, 2].min(), 255)
+
+    def test_tiled(self):
+        '''The tiled rendering gives the same image for any tile height'''
+        expected = self.renderer.render(self.canvas.copy(), paragraphs())
+        for tile_height in (7, 32, 50, 1000):
+            out = self.renderer.render_tiled(self.canvas.copy(), paragraphs(), tile_height)
+            self.assertTrue(np.array_equal(out, expected), tile_height)
+
+
+if __name__ == '__main__':
+    unittest.main()
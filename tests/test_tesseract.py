@@ -0,0 +1,150 @@
+import threading
+import unittest
+
+import numpy as np
+
+from image_translator.utils import ocr_engines
+from image_translator.utils import tesseract
+
+
+class TestTesseract(unittest.TestCase):
+    '''Testing the tesseract helpers'''
+
+    def test_sheet(self):
+        '''Words of the sheet are mapped back to their paragraph'''
+        images = [np.zeros((30, 80), np.uint8), np.zeros((50, 40), np.uint8)]
+        sheet, positions = tesseract.compose_sheet(images, gap=10)
+
+        self.assertEqual(sheet.shape, (30 + 50 + 3 * 10, 80 + 2 * 10))
+        self.assertEqual(positions, [(10, 10), (10, 50)])
+        np.testing.assert_array_equal(sheet[50:100, 10:50], images[1])
+
+        data = {'text': ['a', 'b', 'c'], 'left': [12, 15, 11], 'top': [12, 55, 80],
+                'width': [5, 5, 5], 'height': [8, 8, 8]}
+        parts = tesseract.split_data(data, positions, [30, 50])
+
+        self.assertEqual(parts[0]['text'], ['a'])
+        self.assertEqual(parts[1]['text'], ['b', 'c'])
+        self.assertEqual(parts[1]['top'], [55, 80])
+
+    def test_convert_output(self):
+        '''Empty and low-confidence words are dropped, the words keep their line'''
+        data = {'text': ['', 'Hello', 'x', 'trans-', 'lation'],
+                'conf': [-1, 95.0, 12.0, 90.0, 88.0],
+                'left': [0, 3, 30, 3, 40], 'top': [0, 4, 4, 20, 20],
+                'width': [100, 20, 5, 30, 25], 'height': [50, 10, 10, 10, 10],
+                'block_num': [0, 1, 1, 1, 1], 'par_num': [0, 1, 1, 1, 1],
+                'line_num': [0, 1, 1, 2, 2]}
+        words = tesseract.convert_tesserract_output(data, 100, 200, min_confidence=30)
+
+        self.assertEqual([word['text'] for word in words], ['Hello', 'trans-', 'lation'])
+        self.assertEqual([word['line'] for word in words], [0, 1, 1])
+        self.assertEqual(words[0].to_dict(), {'x1': 97, 'y1': 198, 'x2': 129, 'y2': 220,
+                                              'w': 26, 'h': 16, 'text': 'Hello', 'line': 0,
+                                              'conf': 95.0})
+        self.assertEqual(ocr_engines.join_words(words), 'Hello trans- lation ')
+
+        data['line_num'][4] = 3
+        words = tesseract.convert_tesserract_output(data, 0, 0)
+        self.assertEqual(ocr_engines.join_words(words), 'Hello x translation ')
+
+
+class FakeAPI():
+    '''tesserocr API handle returning a fixed TSV'''
+
+    def __init__(self):
+        self.images = 0
+        self.ended = False
+
+    def SetImage(self, img):
+        self.images += 1
+
+    def GetTSVText(self, page):
+        return '5\t1\t1\t1\t1\t1\t3\t4\t20\t10\t96.5\tHello\n'
+
+    def End(self):
+        self.ended = True
+
+
+class TestTesseractEngine(unittest.TestCase):
+    '''Testing the in-process tesseract engine with fake API handles'''
+
+    def setUp(self):
+        self.engine = tesseract.TesseractEngine('eng', use_api=True)
+        self.created = []
+
+        def new_handle():
+            self.created.append(FakeAPI())
+            return self.created[-1]
+
+        self.engine._new_handle = new_handle
+
+    def test_parse_tsv(self):
+        '''The TSV output is parsed like pytesseract'''
+        tsv = ('level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n'
+               '1\t1\t0\t0\t0\t0\t0\t0\t100\t50\t-1\t\n'
+               '5\t1\t1\t1\t1\t1\t3\t4\t20\t10\t96.5\tHello\n')
+        data = tesseract.parse_tsv(tsv)
+
+        self.assertEqual(data['text'], ['', 'Hello'])
+        self.assertEqual(data['left'], [0, 3])
+        self.assertEqual(data['conf'], [-1.0, 96.5])
+
+    def test_reuse(self):
+        '''A released handle is reused by the next image'''
+        img = np.full((20, 40), 255, np.uint8)
+        for _ in range(3):
+            self.assertEqual(self.engine.image_to_data(img)['text'], ['Hello'])
+
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.created[0].images, 3)
+
+    def test_acquire_release(self):
+        '''A borrowed handle is not lent twice and goes back to the pool'''
+        with self.engine.handle() as first:
+            self.assertEqual(self.engine._handles, [])
+            with self.engine.handle() as second:
+                self.assertIsNot(first, second)
+        self.assertEqual(len(self.engine._handles), 2)
+
+        with self.engine.handle() as api:
+            self.assertIn(api, self.created)
+        self.assertEqual(len(self.created), 2)
+
+    def test_threads(self):
+        '''The threads never get more handles than they use at the same time'''
+        barrier = threading.Barrier(3)
+
+        def borrow():
+            with self.engine.handle():
+                barrier.wait()
+
+        threads = [threading.Thread(target=borrow) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.created), 3)
+        self.assertEqual(len(self.engine._handles), 3)
+
+    def test_exception(self):
+        '''A handle is returned to the pool when the OCR raises'''
+        with self.assertRaises(RuntimeError):
+            with self.engine.handle():
+                raise RuntimeError('ocr failed')
+        self.assertEqual(len(self.engine._handles), 1)
+
+        self.engine.image_to_data(np.full((20, 40), 255, np.uint8))
+        self.assertEqual(len(self.created), 1)
+
+    def test_close(self):
+        '''close ends the pooled handles'''
+        self.engine.warmup()
+        self.engine.close()
+
+        self.assertTrue(self.created[0].ended)
+        self.assertEqual(self.engine._handles, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+
+import cv2
+import numpy as np
+
+from image_translator.utils.text_binarization import TextBin
+
+
+def pixel_intensity(img, xx, yy):
+    '''Per pixel intensity of the original algorithm'''
+    if yy >= len(img) or xx >= len(img[0]):
+        return 0
+    pixel = img[yy][xx]
+    return 0.30 * pixel[2] + 0.59 * pixel[1] + 0.11 * pixel[0]
+
+
+def reference_include(binary, index, h_):
+    '''Recursive walk of the contour hierarchy used before the precomputed pass'''
+    def keep(i):
+        return binary.keep(binary.c(i))
+
+    def count_children(i):
+        if h_[i][2] < 0:
+            return 0
+        return keep(h_[i][2]) + count_siblings(h_[i][2])
+
+    def count_siblings(i):
+        count = count_children(i)
+        for link in (0, 1):
+            p_ = h_[i][link]
+            while p_ > 0:
+                count += keep(p_) + count_children(p_)
+                p_ = h_[p_][link]
+        return count
+
+    def get_parent(i):
+        parent = h_[i][3]
+        while not keep(parent) and parent > 0:
+            parent = h_[parent][3]
+        return parent
+
+    if get_parent(index) > 0 and count_children(get_parent(index)) <= 4:
+        return False
+    return count_children(index) <= 4
+
+
+def reference_run(img):
+    '''Pixel by pixel binarization used before the vectorization'''
+    binary = TextBin(img)
+    blue, green, red = cv2.split(img)
+    edges = cv2.Canny(blue, 200, 250) | cv2.Canny(green, 200, 250) | cv2.Canny(red, 200, 250)
+    binary.contours, hierarchy = cv2.findContours(edges.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+    hierarchy = hierarchy[0]
+
+    new_image = edges.copy()
+    new_image.fill(255)
+    for index_, contour_ in enumerate(binary.contours):
+        if not (binary.keep(contour_) and reference_include(binary, index_, hierarchy)):
+            continue
+        x_, y_, width, height = cv2.boundingRect(contour_)
+
+        fg_int = 0.0
+        for p in contour_:
+            fg_int += pixel_intensity(img, p[0][0], p[0][1])
+        fg_int /= len(contour_)
+
+        corners = [(x_ - 1, y_ - 1), (x_ - 1, y_), (x_, y_ - 1),
+                   (x_ + width + 1, y_ - 1), (x_ + width, y_ - 1), (x_ + width + 1, y_),
+                   (x_ - 1, y_ + height + 1), (x_ - 1, y_ + height), (x_, y_ + height + 1),
+                   (x_ + width + 1, y_ + height + 1), (x_ + width, y_ + height + 1),
+                   (x_ + width + 1, y_ + height)]
+        bg_int = np.median([pixel_intensity(img, xx, yy) for xx, yy in corners])
+        fg, bg = (255, 0) if fg_int >= bg_int else (0, 255)
+
+        for x in range(x_, x_ + width):
+            for y in range(y_, y_ + height):
+                if y >= len(img) or x >= len(img[0]):
+                    continue
+                new_image[y][x] = bg if pixel_intensity(img, x, y) > fg_int else fg
+    return cv2.blur(new_image, (2, 2))
+
+
+def text_image(seed, height, width):
+    '''Generate an image with random text and noise'''
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width, 3), rng.integers(0, 256, 3), np.uint8)
+    for i in range(12):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        position = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.putText(img, f'Text {i}', position, cv2.FONT_HERSHEY_SIMPLEX,
+                    float(rng.uniform(0.3, 1.5)), color, int(rng.integers(1, 3)))
+    return cv2.add(img, rng.integers(0, 30, img.shape).astype(np.uint8))
+
+
+def nested_image(size):
+    '''Generate an image with nested and sibling contours'''
+    img = np.full((size, size, 3), 255, np.uint8)
+    for offset in range(2, size // 2, 6):
+        cv2.rectangle(img, (offset, offset), (size - offset, size - offset), (0, 0, 0), 1)
+    for y in range(size // 2 - 20, size // 2 + 20, 7):
+        for x in range(size // 2 - 20, size // 2 + 20, 7):
+            cv2.circle(img, (x, y), 2, (40, 40, 40), -1)
+    return img
+
+
+class TestTextBin(unittest.TestCase):
+    '''Testing text binarization'''
+
+    def test_hierarchy_filtering(self):
+        '''The precomputed hierarchy pass keeps the same contours'''
+        for img in (text_image(3, 80, 200), nested_image(120)):
+            binary = TextBin(img)
+            blue, green, red = cv2.split(img)
+            edges = cv2.Canny(blue, 200, 250) | cv2.Canny(green, 200, 250) | cv2.Canny(red, 200, 250)
+            binary.contours, hierarchy = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+            binary.index_contours(hierarchy[0])
+
+            for index in range(len(binary.contours)):
+                self.assertEqual(binary.keep_flags[index], binary.keep(binary.c(index)))
+                if binary.keep_flags[index]:
+                    self.assertEqual(binary.include_box(index),
+                                     reference_include(binary, index, hierarchy[0]))
+
+    def test_identical_to_reference(self):
+        '''The vectorized binarization is bit-identical to the pixel loop'''
+        for seed in range(3):
+            img = text_image(seed, 80, 200)
+            np.testing.assert_array_equal(TextBin(img).run(), reference_run(img))
+
+
+if __name__ == '__main__':
+    unittest.main()
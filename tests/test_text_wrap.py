@@ -0,0 +1,44 @@
+import os
+import unittest
+from functools import partial
+
+from image_translator.utils.render import get_font
+from image_translator.utils.text_wrap import fit_font_size, get_wrapper, text_width
+
+FONT_PATH = os.path.join(os.path.dirname(__file__), '..', 'font', 'Cantarell.ttf')
+
+
+class TestTextWrap(unittest.TestCase):
+    '''Testing text wrapping'''
+
+    def setUp(self):
+        '''Set up the text and the font'''
+        self.text = 'The quick brown fox jumps over the lazy dog ' * 3
+        self.font = get_font(FONT_PATH, 20)
+
+    def test_wrap(self):
+        '''Lines are not wider than the max width and keep all the words'''
+        lines = get_wrapper(self.font).wrap(self.text, 150)
+
+        self.assertGreater(len(lines), 1)
+        self.assertEqual(' '.join(lines).split(), self.text.split())
+        for line in lines:
+            self.assertLessEqual(text_width(self.font, line), 150 + 1)
+
+    def test_long_word(self):
+        '''A word wider than the max width is alone on its line'''
+        lines = get_wrapper(self.font).wrap('a verylongwordthatdoesnotfit b', 40)
+
+        self.assertEqual(lines, ['a', 'verylongwordthatdoesnotfit', 'b'])
+
+    def test_fit(self):
+        '''The fitted font size is the largest that fits in the box'''
+        fonts = partial(get_font, FONT_PATH)
+        size = fit_font_size(self.text, fonts, 300, 120)
+
+        self.assertTrue(get_wrapper(fonts(size)).fits(self.text, 300, 120))
+        self.assertFalse(get_wrapper(fonts(size + 1)).fits(self.text, 300, 120))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from image_translator.utils import translators
+from tests.fixtures import patch_registries
+
+
+class TestTranslators(unittest.TestCase):
+    '''Testing the translator registry and the offline backend'''
+
+    def setUp(self):
+        patch_registries(self)
+
+    def test_registry(self):
+        '''The backends are created once and unknown names are rejected'''
+        self.assertIn('google', translators.available())
+        self.assertIs(translators.get('offline'), translators.get('offline'))
+        self.assertEqual(translators.get('bing').lang_code('chi_sim'), 'zh-Hans')
+        with self.assertRaises(translators.UnknownTranslator):
+            translators.get('unknown')
+
+    def test_register(self):
+        '''A registered backend replaces the previous one'''
+        backend = translators.OfflineBackend({'hello': 'bonjour'})
+        translators.register('test', lambda: backend)
+        self.assertIs(translators.get('test'), backend)
+        self.assertEqual(translators.get('test').translate('hello world', 'en', 'fr'), 'bonjour world')
+
+        other = translators.OfflineBackend()
+        translators.register('test', lambda: other)
+        self.assertIs(translators.get('test'), other)
+
+    def test_offline_batch(self):
+        '''The offline backend counts the requests like a packed translator'''
+        backend = translators.OfflineBackend({'Good morning': 'Bonjour', 'cat': 'chat'})
+        backend.max_length = 20
+        texts = ['Good morning', 'a cat', 'another sentence']
+        self.assertEqual(backend.translate_batch(texts, 'en', 'fr'),
+                         ['Bonjour', 'a chat', 'another sentence'])
+        self.assertEqual(backend.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+import numpy as np
+
+from image_translator.types import Paragraph, Word
+
+
+class TestTypes(unittest.TestCase):
+    '''Testing the dict access of the slotted records'''
+
+    def test_word(self):
+        '''A word is read like a dict and has no per-instance dict'''
+        word = Word(text='hello', x1=0, y1=1, x2=10, y2=11, w=10, h=10)
+        self.assertEqual(word['text'], 'hello')
+        self.assertEqual(word.h, 10)
+        self.assertFalse(hasattr(word, '__dict__'))
+        self.assertEqual(word.to_dict()['x2'], 10)
+
+    def test_paragraph(self):
+        '''Unset fields are missing like the keys of a dict'''
+        paragraph = Paragraph(dx=1, dy=2, image=np.zeros((2, 2), np.uint8))
+        self.assertNotIn('text', paragraph)
+        self.assertIsNone(paragraph.get('text'))
+        paragraph['text'] = 'hello'
+        self.assertIn('text', paragraph)
+        self.assertEqual(paragraph.get('text'), 'hello')
+
+        del paragraph['image']
+        self.assertNotIn('image', paragraph)
+        with self.assertRaises(KeyError):
+            paragraph['image']
+        with self.assertRaises(KeyError):
+            paragraph['unknown'] = 0
+        self.assertEqual(paragraph.keys(), ['dx', 'dy', 'text'])
+
+    def test_methods_are_not_keys(self):
+        '''The methods and the attributes of the class are not keys'''
+        paragraph = Paragraph(dx=1)
+        for key in ('keys', 'get', 'to_dict', 'items', '_fields', '__class__'):
+            with self.assertRaises(KeyError):
+                paragraph[key]
+            with self.assertRaises(KeyError):
+                del paragraph[key]
+            self.assertEqual(paragraph.get(key, 'default'), 'default')
+            self.assertNotIn(key, paragraph)
+
+    def test_subclass(self):
+        '''The fields of the bases are keys of a subclass'''
+        class Tagged(Word):
+            __slots__ = ('tag',)
+
+        word = Tagged(text='hello', x1=0, y1=1, x2=10, y2=11, w=10, h=10)
+        word['tag'] = 'title'
+        self.assertEqual(word['tag'], 'title')
+        self.assertEqual(word['x1'], 0)
+        self.assertEqual(word.keys(), ['x1', 'y1', 'x2', 'y2', 'w', 'h', 'text', 'tag'])
+
+
+if __name__ == '__main__':
+    unittest.main()